@@ -0,0 +1,89 @@
+"""partition keyword_rankings by month and add history indexes
+
+Revision ID: 3e9d5a71c4b2
+Revises: 8c3f1a6e2b17
+Create Date: 2026-10-17 15:02:31.604718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3e9d5a71c4b2'
+down_revision: Union[str, Sequence[str], None] = '8c3f1a6e2b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, keyword_id, project_id, search_engine, region, device, position, title, url, snippet, checked_at"
+# Monthly partitions created ahead of the current month; later ones come from
+# the create_ranking_partitions beat task.
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE keyword_rankings RENAME TO keyword_rankings_unpartitioned")
+    op.execute("ALTER TABLE keyword_rankings_unpartitioned RENAME CONSTRAINT keyword_rankings_pkey TO keyword_rankings_unpartitioned_pkey")
+
+    op.execute("""
+        CREATE TABLE keyword_rankings (
+            LIKE keyword_rankings_unpartitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id, checked_at)
+        ) PARTITION BY RANGE (checked_at)
+    """)
+    op.execute("ALTER SEQUENCE keyword_rankings_id_seq OWNED BY keyword_rankings.id")
+    op.create_foreign_key(None, 'keyword_rankings', 'keywords', ['keyword_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key(None, 'keyword_rankings', 'projects', ['project_id'], ['id'], ondelete='CASCADE')
+
+    # One partition per month from the oldest ranking through MONTHS_AHEAD months from now.
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+            last_month date := (date_trunc('month', now()) + interval '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(checked_at), now()))::date INTO month
+            FROM keyword_rankings_unpartitioned;
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF keyword_rankings FOR VALUES FROM (%L) TO (%L)',
+                    'keyword_rankings_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    op.execute("CREATE TABLE keyword_rankings_default PARTITION OF keyword_rankings DEFAULT")
+
+    op.execute(f"""
+        INSERT INTO keyword_rankings ({COLUMNS})
+        SELECT id, keyword_id, project_id, search_engine, region, device, position, title, url, snippet,
+               coalesce(checked_at, now())
+        FROM keyword_rankings_unpartitioned
+    """)
+    op.drop_table('keyword_rankings_unpartitioned')
+
+    op.create_index('ix_keyword_rankings_project_checked', 'keyword_rankings', ['project_id', 'checked_at'], unique=False)
+    op.create_index('ix_keyword_rankings_keyword_history', 'keyword_rankings', ['keyword_id', 'search_engine', 'device', 'checked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE keyword_rankings RENAME TO keyword_rankings_partitioned")
+    op.execute("ALTER TABLE keyword_rankings_partitioned RENAME CONSTRAINT keyword_rankings_pkey TO keyword_rankings_partitioned_pkey")
+
+    op.execute("""
+        CREATE TABLE keyword_rankings (
+            LIKE keyword_rankings_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER TABLE keyword_rankings ALTER COLUMN checked_at DROP NOT NULL")
+    op.execute("ALTER SEQUENCE keyword_rankings_id_seq OWNED BY keyword_rankings.id")
+    op.create_foreign_key(None, 'keyword_rankings', 'keywords', ['keyword_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key(None, 'keyword_rankings', 'projects', ['project_id'], ['id'], ondelete='CASCADE')
+
+    op.execute(f"INSERT INTO keyword_rankings ({COLUMNS}) SELECT {COLUMNS} FROM keyword_rankings_partitioned")
+    op.execute("DROP TABLE keyword_rankings_partitioned CASCADE")
@@ -0,0 +1,27 @@
+"""index keywords.last_checked for the rank-check scheduler
+
+Revision ID: 5b1e7d2c9a40
+Revises: 04bcc7c7bf70
+Create Date: 2026-10-17 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5b1e7d2c9a40'
+down_revision: Union[str, Sequence[str], None] = '04bcc7c7bf70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_keywords_last_checked'), 'keywords', ['last_checked'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_keywords_last_checked'), table_name='keywords')
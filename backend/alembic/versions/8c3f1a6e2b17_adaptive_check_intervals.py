@@ -0,0 +1,31 @@
+"""adaptive check interval columns on keywords
+
+Revision ID: 8c3f1a6e2b17
+Revises: 5b1e7d2c9a40
+Create Date: 2026-10-17 11:40:02.117650
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8c3f1a6e2b17'
+down_revision: Union[str, Sequence[str], None] = '5b1e7d2c9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('keywords', sa.Column('check_interval_hours', sa.Float(), nullable=True))
+    op.add_column('keywords', sa.Column('next_check_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_keywords_next_check_at'), 'keywords', ['next_check_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_keywords_next_check_at'), table_name='keywords')
+    op.drop_column('keywords', 'next_check_at')
+    op.drop_column('keywords', 'check_interval_hours')
@@ -1,13 +1,105 @@
 from celery import Celery
+import os
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 celery_app = Celery(
     "seo_saas",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/0",
+    broker=REDIS_URL,
+    backend=REDIS_URL,
+    include=["app.tasks.scraper", "app.tasks.scheduler", "app.tasks.fairshare", "app.tasks.partitions", "app.tasks.rollups", "app.tasks.dashboard"],
+)
+
+# Per-engine scrape queues, so a slow or throttled engine cannot starve the
+# others and each engine's workers can be scaled on their own. Every value can
+# be overridden with SCRAPER_<ENGINE>_<SETTING>, e.g. SCRAPER_GOOGLE_RATE_LIMIT.
+#
+# Concurrency is sized to the engine's Oxylabs share (app.scrapers.ratelimit)
+# times a few seconds of proxy latency, with headroom. Parsing, archiving and
+# the bulk flushes cost about 17 ms of CPU per page, so more threads than the
+# rate limit can use only hold database connections; raise it together with
+# OXYLABS_<ENGINE>_RATE_LIMIT.
+ENGINE_DEFAULTS = {
+    "google": {"concurrency": 50, "rate_limit": "600/m", "prefetch": 1},
+    "bing": {"concurrency": 25, "rate_limit": "300/m", "prefetch": 1},
+    "yahoo": {"concurrency": 25, "rate_limit": "300/m", "prefetch": 1},
+}
+ENGINES = {
+    engine: {
+        setting: type(default)(os.getenv(f"SCRAPER_{engine.upper()}_{setting.upper()}", default))
+        for setting, default in defaults.items()
+    }
+    for engine, defaults in ENGINE_DEFAULTS.items()
+}
+# Tasks taking an `engine` kwarg; they run on that engine's queue.
+ENGINE_TASKS = (
+    "app.tasks.scraper.run_keyword_scrape",
+    "app.tasks.scraper.run_keyword_batch_scrape",
+    "app.tasks.scraper.run_serp_group_scrape",
+)
+# Tasks fetching a single SERP per message, the only ones a per-task rate limit fits.
+SINGLE_SERP_TASKS = (
+    "app.tasks.scraper.run_keyword_scrape",
+    "app.tasks.scraper.run_serp_group_scrape",
 )
 
-celery_app.conf.task_routes = {
-    "app.tasks.scrapper.*": {"queue": "scraper"},
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Send scrapes to `scraper.<engine>` and the rest of app.tasks.scraper to `scraper`."""
+    if not name.startswith("app.tasks.scraper."):
+        return None
+    engine = str((kwargs or {}).get("engine", "")).lower()
+    if name in ENGINE_TASKS and engine in ENGINES:
+        return {"queue": f"scraper.{engine}"}
+    return {"queue": "scraper"}
+
+
+celery_app.conf.task_routes = (route_task,)
+
+# A worker started with CELERY_WORKER_ENGINE=<engine> (and -Q scraper.<engine>)
+# takes that engine's concurrency and prefetch, and rate limits its single-SERP
+# scrapes with Celery's per-worker token bucket. Celery counts task messages,
+# and a run_keyword_batch_scrape message carries up to SCRAPE_BATCH_SIZE
+# keywords, so batches get no annotation: their proxy calls are paced by the
+# shared Redis token bucket in app.scrapers.ratelimit, which every scrape
+# passes through anyway.
+#
+# Scraper workers default to the thread pool: a scrape task only waits on the
+# process-wide asyncio loop (app.scrapers.client) where the HTTP I/O happens,
+# so one process can run hundreds of them. gevent/eventlet are not used
+# because monkey-patching breaks that loop's thread and needs psycogreen for
+# psycopg2.
+SCRAPER_WORKER_POOL = os.getenv("SCRAPER_WORKER_POOL", "threads")
+WORKER_ENGINE = os.getenv("CELERY_WORKER_ENGINE")
+if WORKER_ENGINE in ENGINES:
+    settings = ENGINES[WORKER_ENGINE]
+    celery_app.conf.worker_pool = SCRAPER_WORKER_POOL
+    celery_app.conf.worker_concurrency = settings["concurrency"]
+    celery_app.conf.worker_prefetch_multiplier = settings["prefetch"]
+    celery_app.conf.task_annotations = {name: {"rate_limit": settings["rate_limit"]} for name in SINGLE_SERP_TASKS}
+
+celery_app.conf.beat_schedule = {
+    "schedule-due-keywords": {
+        "task": "app.tasks.scheduler.schedule_due_keywords",
+        "schedule": float(os.getenv("SCHEDULER_TICK_SECONDS", "900")),
+    },
+    "drain-fair-queue": {
+        "task": "app.tasks.fairshare.drain_fair_queue",
+        "schedule": float(os.getenv("FAIRSHARE_DRAIN_SECONDS", "5")),
+    },
+    "create-ranking-partitions": {
+        "task": "app.tasks.partitions.create_ranking_partitions",
+        "schedule": 86400.0,
+    },
+    "downsample-ranking-history": {
+        "task": "app.tasks.rollups.downsample_ranking_history",
+        "schedule": 86400.0,
+    },
+    # Recomputes the Redis dashboard counters from SQL to undo any drift.
+    "refresh-dashboard-stats": {
+        "task": "app.tasks.dashboard.refresh_dashboard_stats",
+        "schedule": float(os.getenv("DASHBOARD_REFRESH_SECONDS", "3600")),
+    },
 }
 
 @celery_app.task
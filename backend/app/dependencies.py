@@ -33,3 +33,10 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
         return None
     
     return user
+
+
+def user_project_ids(db: Session, user: models.User) -> list[int]:
+    """Ids of the projects `user` owns or is a member of."""
+    owned = db.query(models.Project.id).filter(models.Project.owner_id == user.id)
+    member = db.query(models.ProjectMember.project_id).filter(models.ProjectMember.user_id == user.id)
+    return [project_id for (project_id,) in owned.union(member)]
@@ -1,15 +1,18 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, projects, keywords, billing, myfatoorah, admin, team_invite, members, users, rankings, scraper
+from app.routers import auth, projects, keywords, billing, myfatoorah, admin, team_invite, members, users, rankings, scraper, dashboard
 from app.database import Base, engine
 from app.scrapers.google import GoogleScraper
+from app.tasks.partitions import ensure_partitions
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    ensure_partitions(conn)
 
 origins = list(filter(None, [
     os.getenv("BASE_URL"),
@@ -33,6 +36,7 @@ app.include_router(users.router, prefix="/api", tags=["Users"])
 app.include_router(members.router, prefix="/api", tags=["ProjectMembers"])
 app.include_router(team_invite.router, prefix="/api")
 app.include_router(keywords.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api", tags=["Dashboard"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
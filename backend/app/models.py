@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Float, JSON, Enum, Table, UniqueConstraint
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Date, DateTime, Boolean, Text, Float, JSON, Enum, Table, UniqueConstraint, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -143,20 +144,25 @@ class Keyword(Base):
     priority = Column(Integer, nullable=True)
     is_paused = Column(Boolean, default=False)
 
-    last_checked = Column(DateTime)
+    last_checked = Column(DateTime, index=True)
+    # Adaptive schedule maintained by app.tasks.scheduler; NULL until the first scheduled check.
+    check_interval_hours = Column(Float, nullable=True)
+    next_check_at = Column(DateTime, nullable=True, index=True)
     added_at = Column(DateTime, default=datetime.utcnow)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
 
     project = relationship("Project", back_populates="keywords")
-    rankings = relationship("KeywordRanking", back_populates="keyword")
+    rankings = relationship("KeywordRanking", back_populates="keyword", passive_deletes=True)
+    latest_ranks = relationship("KeywordLatestRank", back_populates="keyword", passive_deletes=True)
 
 
 # -------------------------------
 # RANK TRACKING HISTORY
 # -------------------------------
 class KeywordRanking(Base):
+    """Partitioned by month on checked_at (see app.tasks.partitions), hence the (id, checked_at) key."""
     __tablename__ = "keyword_rankings"
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     keyword_id = Column(Integer, ForeignKey("keywords.id", ondelete="CASCADE"), nullable=False)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
 
@@ -169,11 +175,140 @@ class KeywordRanking(Base):
     url = Column(String)
     snippet = Column(Text)
     
-    checked_at = Column(DateTime, server_default=func.now())
+    checked_at = Column(DateTime, primary_key=True, server_default=func.now())
 
     keyword = relationship("Keyword", back_populates="rankings")
     project = relationship("Project")
 
+    __table_args__ = (
+        Index("ix_keyword_rankings_project_checked", "project_id", "checked_at"),
+        Index("ix_keyword_rankings_keyword_history", "keyword_id", "search_engine", "device", "checked_at"),
+        {"postgresql_partition_by": "RANGE (checked_at)"},
+    )
+
+
+class KeywordLatestRank(Base):
+    """Current, previous and best position per (keyword, engine, region, device).
+
+    Maintained by app.tasks.latest_rank whenever rankings are written, so
+    keyword listings never have to aggregate keyword_rankings.
+    """
+    __tablename__ = "keyword_latest_rank"
+    keyword_id = Column(Integer, ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True)
+    search_engine = Column(Enum(SearchEngine), primary_key=True)
+    region = Column(String, primary_key=True)
+    device = Column(Enum(DeviceType), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    position = Column(Integer)
+    previous_position = Column(Integer)
+    best_position = Column(Integer)
+    change = Column(Integer)  # previous - current, so positive means the keyword moved up
+    url = Column(String)
+    checked_at = Column(DateTime, nullable=False)
+
+    keyword = relationship("Keyword", back_populates="latest_ranks")
+
+
+class KeywordRankRollup(Base):
+    """Daily and weekly position aggregates per (keyword, engine, region, device).
+
+    Maintained by app.tasks.rollups as rankings are written; charts over long
+    ranges read these instead of keyword_rankings, whose old rows get thinned.
+    """
+    __tablename__ = "keyword_rank_rollups"
+    keyword_id = Column(Integer, ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True)
+    search_engine = Column(Enum(SearchEngine), primary_key=True)
+    region = Column(String, primary_key=True)
+    device = Column(Enum(DeviceType), primary_key=True)
+    period = Column(String, primary_key=True)  # "day" or "week" (weeks start on Monday)
+    period_start = Column(Date, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+
+    min_position = Column(Integer, nullable=False)
+    max_position = Column(Integer, nullable=False)
+    position_sum = Column(Integer, nullable=False)
+    checks = Column(Integer, nullable=False)  # average = position_sum / checks
+    last_position = Column(Integer, nullable=False)
+    last_checked_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_keyword_rank_rollups_project_period", "project_id", "period", "period_start"),
+    )
+
+
+# -------------------------------
+# SERP SNAPSHOTS
+# -------------------------------
+class SerpDomain(Base):
+    """Dictionary of result domains referenced by SerpSnapshot.domain_ids."""
+    __tablename__ = "serp_domains"
+    id = Column(Integer, primary_key=True)
+    domain = Column(String, unique=True, nullable=False)
+
+
+class SerpSnapshot(Base):
+    """One fetched SERP, stored column-wise: ordered domain ids and positions,
+    plus URLs and titles as a zlib-compressed JSON blob."""
+    __tablename__ = "serp_snapshots"
+    id = Column(Integer, primary_key=True)
+    search_engine = Column(Enum(SearchEngine), nullable=False)
+    query = Column(String, nullable=False)  # normalized keyword
+    region = Column(String, nullable=False, default="global")
+    device = Column(Enum(DeviceType), nullable=False, default=DeviceType.DESKTOP)
+    language = Column(String, nullable=False, default="en")
+
+    domain_ids = Column(ARRAY(Integer), nullable=False)
+    positions = Column(ARRAY(SmallInteger), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+
+    fetched_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_serp_snapshots_lookup", "search_engine", "query", "region", "device", "fetched_at"),
+    )
+
+
+class SerpPage(Base):
+    """Index of raw SERP pages kept in the zstd archive (see app.scrapers.archive)."""
+    __tablename__ = "serp_pages"
+    id = Column(Integer, primary_key=True)
+    search_engine = Column(Enum(SearchEngine), nullable=False)
+    query = Column(String, nullable=False)  # normalized keyword
+    region = Column(String, nullable=False, default="global")
+    device = Column(Enum(DeviceType), nullable=False, default=DeviceType.DESKTOP)
+    language = Column(String, nullable=False, default="en")
+
+    page = Column(SmallInteger, nullable=False)
+    position_base = Column(SmallInteger, nullable=False, default=0)
+    content_hash = Column(String(64), nullable=False)
+
+    fetched_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_serp_pages_lookup", "search_engine", "query", "fetched_at"),
+    )
+
+
+# -------------------------------
+# SCRAPE RUNS
+# -------------------------------
+class ScrapeRun(Base):
+    """One triggered rank check of a project; `idempotency_key` makes repeated triggers no-ops."""
+    __tablename__ = "scrape_runs"
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    idempotency_key = Column(String, unique=True, nullable=False)
+    search_engines = Column(ARRAY(String), nullable=False)
+    region = Column(String, nullable=False, default="global")
+    device = Column(String, nullable=False, default="desktop")
+    status = Column(String, nullable=False, default="pending")  # pending -> queued
+    jobs = Column(Integer, nullable=False, default=0)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    project = relationship("Project")
+
 
 # -------------------------------
 # SITE AUDIT RESULT
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
 from app.permissions import require_admin
+from app.tasks.adaptive import savings_report
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -19,3 +20,8 @@ def promote_user(user_id: int, admin=Depends(require_admin), db: Session = Depen
     user.system_role = "admin"
     db.commit()
     return {"message": f"{user.email} promoted to admin"}
+
+
+@router.get("/scheduler/savings")
+def scheduler_savings(admin=Depends(require_admin), db: Session = Depends(get_db)):
+    return savings_report(db)
\ No newline at end of file
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from app import models, schemas
+from app.database import get_db
+from app.dependencies import get_current_user, user_project_ids
+from app.tasks.dashboard import dashboard_stats, parse_series
+
+router = APIRouter(tags=["Dashboard"])
+
+
+def require_project_ids(db: Session, user) -> list[int]:
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return user_project_ids(db, user)
+
+@router.get("/dashboard/stats", response_model=schemas.DashboardStatsOut)
+def get_dashboard_stats(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Read from the precomputed per-project counters in Redis (app.tasks.dashboard)."""
+    project_ids = require_project_ids(db, user)
+    totals = dashboard_stats.summary(project_ids)
+    week_ago = dashboard_stats.trend(project_ids, 8)[0][1]["keywords"]
+    members = db.query(func.count(models.ProjectMember.user_id.distinct())).join(models.Project).filter(
+        models.Project.owner_id == user.id,
+        models.ProjectMember.user_id != user.id,
+    ).scalar()
+
+    return {
+        "totalProjects": len(project_ids),
+        "totalKeywords": totals["keywords"],
+        "keywordsChange": round((totals["keywords"] - week_ago) / week_ago * 100, 1) if week_ago else 0,
+        "teamMembers": members,
+        "rankedKeywords": totals["ranked"],
+        "averagePosition": round(totals["position_sum"] / totals["ranked"], 1) if totals["ranked"] else None,
+        "top10Keywords": totals["top10"],
+        "moversUp": totals["up"],
+        "moversDown": totals["down"],
+        "visibility": round(totals["visibility"], 4),
+    }
+
+@router.get("/keywords/top-ranking", response_model=list[schemas.TopKeywordOut])
+def get_top_keywords(limit: int = Query(5, ge=1, le=50), db: Session = Depends(get_db), user=Depends(get_current_user)):
+    top = dashboard_stats.top(require_project_ids(db, user), limit)
+    keys = [parse_series(member) for _, member in top]
+    if not keys:
+        return []
+
+    Rank = models.KeywordLatestRank
+    rows = {
+        (rank.keyword_id, rank.search_engine, rank.region, rank.device): (rank, keyword)
+        for rank, keyword in db.query(Rank, models.Keyword.keyword)
+        .join(models.Keyword, models.Keyword.id == Rank.keyword_id)
+        .filter(tuple_(Rank.keyword_id, Rank.search_engine, Rank.region, Rank.device).in_(keys))
+    }
+    return [
+        {
+            "keyword_id": rank.keyword_id,
+            "project_id": rank.project_id,
+            "keyword": keyword,
+            "search_engine": rank.search_engine,
+            "device": rank.device,
+            "position": rank.position,
+            "change": rank.change or 0,
+        }
+        for rank, keyword in (rows[key] for key in keys if key in rows)
+    ]
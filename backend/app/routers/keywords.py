@@ -1,21 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from app import models, schemas
 from app.database import get_db
+from app.tasks.dashboard import dashboard_stats
 
 router = APIRouter(
     prefix="/projects/{project_id}/keywords",
     tags=["Keywords"]
 )
 
-@router.get("/", response_model=list[schemas.KeywordOut])
+@router.get("/", response_model=list[schemas.KeywordWithRankOut])
 def get_keywords(project_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Keyword).filter(models.Keyword.project_id == project_id).all()
+    # Current/previous/best positions come from keyword_latest_rank, joined on its primary key.
+    return (
+        db.query(models.Keyword)
+        .outerjoin(models.Keyword.latest_ranks)
+        .options(contains_eager(models.Keyword.latest_ranks))
+        .filter(models.Keyword.project_id == project_id)
+        .order_by(models.Keyword.id)
+        .all()
+    )
 
 @router.post("/", response_model=schemas.KeywordOut)
 def create_keyword(project_id: int, keyword_data: schemas.KeywordCreate, db: Session = Depends(get_db)):
     keyword = models.Keyword(**keyword_data.dict(), project_id=project_id)
     db.add(keyword)
+    dashboard_stats.keyword_added(db, project_id)
     db.commit()
     db.refresh(keyword)
     return keyword
@@ -25,6 +35,7 @@ def delete_keyword(project_id: int, keyword_id: int, db: Session = Depends(get_d
     keyword = db.query(models.Keyword).filter_by(id=keyword_id, project_id=project_id).first()
     if not keyword:
         raise HTTPException(status_code=404, detail="Keyword not found")
+    dashboard_stats.keyword_removed(db, keyword)
     db.delete(keyword)
     db.commit()
     return {"detail": "Keyword deleted"}
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session, joinedload
 from app import models, schemas
 from app.database import get_db
 from app.dependencies import get_current_user
+from app.tasks.dashboard import dashboard_stats
 
 router = APIRouter(tags=["Projects"])
 
@@ -132,6 +133,7 @@ def delete_project(project_id: int, db: Session = Depends(get_db), user=Depends(
     project = db.query(models.Project).filter(models.Project.id == project_id, models.Project.owner_id == user.id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Not found")
+    dashboard_stats.project_removed(db, project.id)
     db.delete(project)
     db.commit()
     return {"detail": "Deleted"}
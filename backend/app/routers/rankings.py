@@ -1,31 +1,202 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, joinedload
 from app import models, schemas
 from app.database import get_db
+from app.dependencies import get_current_user, user_project_ids
+from app.snapshots import competitor_positions, domain_of, visibility_trend
+from app.tasks.dashboard import TREND_DAYS, dashboard_stats
+from app.tasks.latest_rank import upsert_latest_ranks
+from app.tasks.rollups import period_start, upsert_rank_rollups
+from app.tasks.writer import rebuild_ranking_aggregates
 
 router = APIRouter(prefix="/rankings", tags=["Keyword Rankings"])
 
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Charts spanning more days than this default to weekly points.
+WEEKLY_CHART_DAYS = 90
+
+
+def as_naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Rankings are stored as naive UTC; `?from=...Z` and `+03:00` arrive timezone-aware."""
+    if moment and moment.tzinfo:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def encode_cursor(ranking: models.KeywordRanking) -> str:
+    return base64.urlsafe_b64encode(f"{ranking.checked_at.isoformat()}|{ranking.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        checked_at, ranking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(checked_at), int(ranking_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def ranking_page(query, cursor: Optional[str], limit: int, from_: Optional[datetime], to: Optional[datetime],
+                 engine: Optional[models.SearchEngine], device: Optional[models.DeviceType]) -> dict:
+    """Newest-first page of `query` after `cursor`, keyed on (checked_at, id) so pages
+    stay stable while new rankings arrive and only `limit` rows are ever loaded."""
+    Ranking = models.KeywordRanking
+    from_, to = as_naive_utc(from_), as_naive_utc(to)
+    if from_:
+        query = query.filter(Ranking.checked_at >= from_)
+    if to:
+        query = query.filter(Ranking.checked_at < to)
+    if engine:
+        query = query.filter(Ranking.search_engine == engine)
+    if device:
+        query = query.filter(Ranking.device == device)
+    if cursor:
+        query = query.filter(tuple_(Ranking.checked_at, Ranking.id) < decode_cursor(cursor))
+
+    rows = query.order_by(Ranking.checked_at.desc(), Ranking.id.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+    return {"items": items, "next_cursor": encode_cursor(items[-1]) if len(rows) > limit else None}
+
 @router.post("/", response_model=schemas.KeywordRankingOut)
 def create_ranking(ranking: schemas.KeywordRankingCreate, db: Session = Depends(get_db)):
-    db_ranking = models.KeywordRanking(**ranking.dict())
+    row = {**ranking.dict(), "checked_at": datetime.utcnow()}
+    db_ranking = models.KeywordRanking(**row)
     db.add(db_ranking)
+    dashboard_stats.record_rankings(db, [row])
+    upsert_latest_ranks(db, [row])
+    upsert_rank_rollups(db, [row])
     db.commit()
     db.refresh(db_ranking)
     return db_ranking
 
-@router.get("/project/{project_id}", response_model=list[schemas.KeywordRankingOut])
-def get_rankings_by_project(project_id: int, db: Session = Depends(get_db)):
-    return db.query(models.KeywordRanking).filter(models.KeywordRanking.project_id == project_id).all()
+@router.get("/project/{project_id}", response_model=schemas.KeywordRankingPage)
+def get_rankings_by_project(
+    project_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    engine: Optional[models.SearchEngine] = None,
+    device: Optional[models.DeviceType] = None,
+    keyword_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.KeywordRanking).filter(models.KeywordRanking.project_id == project_id)
+    if keyword_id:
+        query = query.filter(models.KeywordRanking.keyword_id == keyword_id)
+    return ranking_page(query, cursor, limit, from_, to, engine, device)
+
+@router.get("/keyword/{keyword_id}", response_model=schemas.KeywordRankingPage)
+def get_rankings_by_keyword(
+    keyword_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    engine: Optional[models.SearchEngine] = None,
+    device: Optional[models.DeviceType] = None,
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.KeywordRanking).filter(models.KeywordRanking.keyword_id == keyword_id)
+    return ranking_page(query, cursor, limit, from_, to, engine, device)
+
+@router.get("/keyword/{keyword_id}/competitors", response_model=list[schemas.CompetitorOut])
+def get_keyword_competitors(keyword_id: int, days: int = 30, db: Session = Depends(get_db)):
+    keyword = db.query(models.Keyword).options(joinedload(models.Keyword.project)).filter(models.Keyword.id == keyword_id).first()
+    if not keyword:
+        raise HTTPException(status_code=404, detail="Keyword not found")
+
+    project = keyword.project
+    since = datetime.utcnow() - timedelta(days=days)
+    return competitor_positions(db, project.search_engine, keyword.keyword, project.target_region, since)
+
+@router.get("/project/{project_id}/visibility", response_model=list[schemas.VisibilityPoint])
+def get_project_visibility(project_id: int, days: int = 30, db: Session = Depends(get_db)):
+    project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    queries = [k for (k,) in db.query(models.Keyword.keyword).filter(models.Keyword.project_id == project_id)]
+    since = datetime.utcnow() - timedelta(days=days)
+    return visibility_trend(db, domain_of(project.url), queries, since)
+
+@router.get("/chart-data", response_model=list[schemas.ChartPoint])
+def get_chart_data(
+    project_id: Optional[int] = None,
+    keyword_id: Optional[int] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    granularity: Optional[Literal["day", "week"]] = None,
+    engine: Optional[models.SearchEngine] = None,
+    device: Optional[models.DeviceType] = None,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Position trend from the daily/weekly rollups: one point per period, never raw rows.
+
+    The unfiltered dashboard chart (recent days across all the caller's
+    projects) comes from the precomputed daily counters in Redis instead.
+    """
+    from_, to = as_naive_utc(from_), as_naive_utc(to)
+    days = (datetime.utcnow() - from_).days + 1 if from_ else 7
+    if not any((project_id, keyword_id, to, granularity, engine, device)) and days <= TREND_DAYS:
+        if not user:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        return [
+            {"date": day.isoformat(), "keywords": totals["ranked"],
+             "average_position": round(totals["position_sum"] / totals["ranked"], 1) if totals["ranked"] else None,
+             "visibility": round(totals["visibility"], 4)}
+            for day, totals in dashboard_stats.trend(user_project_ids(db, user), days)
+        ]
+
+    to = to or datetime.utcnow()
+    from_ = from_ or to - timedelta(days=7)
+    period = granularity or ("week" if (to - from_).days > WEEKLY_CHART_DAYS else "day")
+
+    Rollup = models.KeywordRankRollup
+    query = db.query(
+        Rollup.period_start,
+        func.count(Rollup.keyword_id.distinct()),
+        func.avg(Rollup.position_sum * 1.0 / Rollup.checks),
+        func.min(Rollup.min_position),
+        func.max(Rollup.max_position),
+    ).filter(
+        Rollup.period == period,
+        Rollup.period_start >= period_start(period, from_),
+        Rollup.period_start <= to.date(),
+    )
+    if keyword_id:
+        query = query.filter(Rollup.keyword_id == keyword_id)
+    if project_id:
+        query = query.filter(Rollup.project_id == project_id)
+    elif not keyword_id:
+        if not user:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        query = query.filter(Rollup.project_id.in_(user_project_ids(db, user)))
+    if engine:
+        query = query.filter(Rollup.search_engine == engine)
+    if device:
+        query = query.filter(Rollup.device == device)
 
-@router.get("/keyword/{keyword_id}", response_model=list[schemas.KeywordRankingOut])
-def get_rankings_by_keyword(keyword_id: int, db: Session = Depends(get_db)):
-    return db.query(models.KeywordRanking).filter(models.KeywordRanking.keyword_id == keyword_id).all()
+    rows = query.group_by(Rollup.period_start).order_by(Rollup.period_start).all()
+    return [
+        {"date": start.isoformat(), "keywords": count, "average_position": round(float(average), 1),
+         "best_position": best, "worst_position": worst}
+        for start, count, average, best, worst in rows
+    ]
 
 @router.delete("/{ranking_id}")
 def delete_ranking(ranking_id: int, db: Session = Depends(get_db)):
-    ranking = db.query(models.KeywordRanking).get(ranking_id)
+    ranking = db.query(models.KeywordRanking).filter(models.KeywordRanking.id == ranking_id).first()
     if not ranking:
         raise HTTPException(status_code=404, detail="Ranking not found")
+    keyword_id, checked_at = ranking.keyword_id, ranking.checked_at
     db.delete(ranking)
+    db.flush()
+    rebuild_ranking_aggregates(db, [keyword_id], checked_at, checked_at)
     db.commit()
     return {"detail": "Ranking deleted"}
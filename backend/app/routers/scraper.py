@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import Project
+from app.models import Project, ScrapeRun
+from app.tasks.progress import run_progress
+from app.tasks.runs import create_run
 from app.tasks.scraper import run_rank_tracking_task
 from app.dependencies import get_current_user
 from app.schemas import ScrapeRequest
@@ -9,8 +15,15 @@ from starlette.status import HTTP_202_ACCEPTED
 
 router = APIRouter(prefix="/projects", tags=["Scraper"])
 
+# How often the progress stream polls Redis, and how often it sends a keep-alive comment.
+STREAM_POLL_SECONDS = 1.0
+STREAM_HEARTBEAT_SECONDS = 15.0
+
 @router.post("/{project_id}/scrape", status_code=HTTP_202_ACCEPTED)
-def trigger_scrape(project_id: int, payload: ScrapeRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def trigger_scrape(project_id: int, payload: ScrapeRequest, db: Session = Depends(get_db), user=Depends(get_current_user),
+                   idempotency_key: str | None = Header(None)):
+    """Start a rank check; repeating it with the same Idempotency-Key (by default,
+    the same project, engines, region and device on the same day) is a no-op."""
     project = db.query(Project).filter(Project.id == project_id).first()
 
     if not project:
@@ -19,11 +32,71 @@ def trigger_scrape(project_id: int, payload: ScrapeRequest, db: Session = Depend
     if project.owner_id != user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    run_rank_tracking_task.delay(
-        project_id=project.id,
-        search_engines=payload.search_engines,
-        region=payload.region,
-        device=payload.device
+    run, created = create_run(
+        db, project.id, [engine.value for engine in payload.search_engines], payload.region, payload.device.value,
+        key=idempotency_key and f"{project.id}:{idempotency_key}", user_id=user.id,
     )
+    if not created:
+        return {"message": "Rank tracking already started", "run_id": run.id}
+
+    try:
+        run_rank_tracking_task.delay(
+            project_id=project.id,
+            search_engines=payload.search_engines,
+            region=payload.region,
+            device=payload.device,
+            run_id=run.id,
+        )
+    except Exception as e:
+        # Drop the run so its idempotency key does not block a retry for the rest of the day.
+        print(f"[!] Could not queue rank tracking for project {project.id}: {str(e)}")
+        db.delete(run)
+        db.commit()
+        raise HTTPException(status_code=503, detail="Could not start rank tracking, please try again")
+
+    return {"message": "Rank tracking started", "run_id": run.id}
+
+
+def get_owned_run(project_id: int, run_id: int, db: Session, user) -> ScrapeRun:
+    run = db.query(ScrapeRun).filter(ScrapeRun.id == run_id, ScrapeRun.project_id == project_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Scrape run not found")
+    if not user or run.project.owner_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return run
+
+
+@router.get("/{project_id}/scrape/{run_id}")
+def get_scrape_status(project_id: int, run_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Progress counters of a scrape run, read from Redis without touching the rankings tables."""
+    run = get_owned_run(project_id, run_id, db, user)
+    return {"run_id": run.id, "status": run.status, **run_progress.get(run.id)}
+
+
+@router.get("/{project_id}/scrape/{run_id}/stream")
+async def stream_scrape_status(project_id: int, run_id: int, request: Request, db: Session = Depends(get_db),
+                               user=Depends(get_current_user)):
+    """Server-Sent Events stream of a run's progress: a `progress` event whenever the
+    counters change and a final `done` event once every queued job has finished."""
+    run = await run_in_threadpool(get_owned_run, project_id, run_id, db, user)
+    run_id = run.id
+    # The stream only reads Redis and may stay open for minutes: give the connection back now.
+    await run_in_threadpool(db.close)
+
+    async def events():
+        last, idle = None, 0.0
+        while not await request.is_disconnected():
+            progress = await run_in_threadpool(run_progress.get, run_id)
+            if progress != last:
+                last, idle = progress, 0.0
+                event = "done" if progress["finished"] else "progress"
+                yield f"event: {event}\ndata: {json.dumps({'run_id': run_id, **progress})}\n\n"
+                if progress["finished"]:
+                    return
+            elif idle >= STREAM_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+            idle += STREAM_POLL_SECONDS
 
-    return {"message": "Rank tracking started"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
\ No newline at end of file
@@ -97,6 +97,23 @@ class KeywordOut(KeywordCreate):
     class Config:
         orm_mode = True
 
+class KeywordLatestRankOut(BaseModel):
+    search_engine: SearchEngine
+    region: str
+    device: DeviceType
+    position: Optional[int] = None
+    previous_position: Optional[int] = None
+    best_position: Optional[int] = None
+    change: Optional[int] = None
+    url: Optional[str] = None
+    checked_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class KeywordWithRankOut(KeywordOut):
+    latest_ranks: List[KeywordLatestRankOut] = []
+
 class TeamInviteCreate(BaseModel):
     email: EmailStr
     role: UserRole = UserRole.VIEWER
@@ -152,6 +169,51 @@ class KeywordRankingOut(KeywordRankingBase):
     class Config:
         orm_mode = True
 
+class KeywordRankingPage(BaseModel):
+    items: List[KeywordRankingOut]
+    next_cursor: Optional[str] = None
+
+class CompetitorOut(BaseModel):
+    domain: str
+    appearances: int
+    average_position: float
+    best_position: int
+
+class VisibilityPoint(BaseModel):
+    date: str
+    visibility: float
+
+class ChartPoint(BaseModel):
+    date: str
+    keywords: int  # keywords with a position in the period
+    average_position: Optional[float] = None
+    best_position: Optional[int] = None
+    worst_position: Optional[int] = None
+    visibility: Optional[float] = None
+
+# Dashboard payloads use the camelCase keys the frontend reads.
+class DashboardStatsOut(BaseModel):
+    totalProjects: int
+    totalKeywords: int
+    keywordsChange: float  # % against seven days ago
+    teamMembers: int
+    rankedKeywords: int
+    averagePosition: Optional[float] = None
+    top10Keywords: int
+    moversUp: int
+    moversDown: int
+    visibility: float
+
+class TopKeywordOut(BaseModel):
+    keyword_id: int
+    project_id: int
+    keyword: str
+    search_engine: SearchEngine
+    device: DeviceType
+    position: int
+    change: int
+    volume: int = 0  # no search volume source yet
+
 
 class ScrapeRequest(BaseModel):
     search_engines: List[SearchEngine] = Field(..., example=["google", "bing"] )
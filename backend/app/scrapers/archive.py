@@ -0,0 +1,38 @@
+import hashlib
+import os
+import tempfile
+
+import zstandard
+
+ARCHIVE_DIR = os.getenv("SERP_ARCHIVE_DIR", "serp-archive")
+COMPRESSION_LEVEL = int(os.getenv("SERP_ARCHIVE_LEVEL", "10"))
+
+
+def _path(content_hash: str) -> str:
+    return os.path.join(ARCHIVE_DIR, content_hash[:2], f"{content_hash}.html.zst")
+
+
+def store(html: str) -> str:
+    """Write a page to the content-addressed archive and return its sha256.
+
+    Identical pages are stored once; the write goes through a temp file so
+    readers never see a partial file.
+    """
+    data = html.encode()
+    content_hash = hashlib.sha256(data).hexdigest()
+    path = _path(content_hash)
+    if os.path.exists(path):
+        return content_hash
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compressed = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, path)
+    return content_hash
+
+
+def load(content_hash: str) -> str:
+    with open(_path(content_hash), "rb") as f:
+        return zstandard.ZstdDecompressor().decompress(f.read()).decode()
@@ -0,0 +1,74 @@
+import os
+
+from app.database import redis_client
+
+# Failures within FAILURE_WINDOW seconds that open an engine's circuit, and how
+# long it then stays open before a single probe request is let through.
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "10"))
+FAILURE_WINDOW = int(os.getenv("BREAKER_FAILURE_WINDOW", "60"))
+COOLDOWN = int(os.getenv("BREAKER_COOLDOWN", "300"))
+# How long a probe may run before another caller may probe instead.
+PROBE_TIMEOUT = int(os.getenv("BREAKER_PROBE_TIMEOUT", "60"))
+
+
+class CircuitBreaker:
+    """Per-engine circuit breaker shared by all workers through Redis.
+
+    closed: requests flow and failures are counted in a fixed window.
+    open: `FAILURE_THRESHOLD` failures opened it; nothing is sent for `COOLDOWN`.
+    half-open: after the cooldown one caller probes; success closes the
+    circuit, failure opens it again.
+    """
+
+    def __init__(self, client=redis_client, threshold: int = FAILURE_THRESHOLD, window: int = FAILURE_WINDOW,
+                 cooldown: int = COOLDOWN, probe_timeout: int = PROBE_TIMEOUT):
+        self.client = client
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+
+    @staticmethod
+    def _key(engine: str, part: str) -> str:
+        return f"breaker:{engine}:{part}"
+
+    def retry_in(self, engine: str) -> float:
+        """Seconds until the engine's circuit may be tried again; 0 when closed."""
+        ttl = self.client.pttl(self._key(engine, "open"))
+        return ttl / 1000 if ttl > 0 else 0
+
+    def open_engines(self, engines) -> list[str]:
+        return [engine for engine in engines if self.retry_in(engine)]
+
+    def allow(self, engine: str) -> bool:
+        """Whether a request to `engine` may go out now."""
+        if self.retry_in(engine):
+            return False
+        if not self.client.exists(self._key(engine, "tripped")):
+            return True
+        # Half-open: only one probe at a time.
+        return bool(self.client.set(self._key(engine, "probe"), 1, nx=True, ex=self.probe_timeout))
+
+    def record_success(self, engine: str):
+        if self.client.exists(self._key(engine, "tripped")):
+            print(f"[✓] Circuit for {engine} closed")
+        self.client.delete(self._key(engine, "failures"), self._key(engine, "tripped"), self._key(engine, "probe"))
+
+    def record_failure(self, engine: str):
+        failures_key = self._key(engine, "failures")
+        with self.client.pipeline() as pipe:
+            pipe.incr(failures_key)
+            pipe.expire(failures_key, self.window, nx=True)
+            pipe.exists(self._key(engine, "tripped"))
+            failures, _, tripped = pipe.execute()
+
+        if tripped or failures >= self.threshold:
+            with self.client.pipeline() as pipe:
+                pipe.set(self._key(engine, "open"), 1, ex=self.cooldown)
+                pipe.set(self._key(engine, "tripped"), 1)
+                pipe.delete(failures_key, self._key(engine, "probe"))
+                pipe.execute()
+            print(f"[!] Circuit for {engine} opened for {self.cooldown}s after {failures} failures")
+
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import time
+
+from app.database import REDIS_URL
+from app.scrapers.client import async_redis
+
+SERP_CACHE_TTL = int(os.getenv("SERP_CACHE_TTL", str(6 * 3600)))
+SERP_CACHE_MAX_ENTRIES = int(os.getenv("SERP_CACHE_MAX_ENTRIES", "50000"))
+
+# Sorted set of cache keys scored by last access, used for LRU eviction.
+LRU_INDEX_KEY = "serp:lru"
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+def cache_key(engine: str, keyword: str, region: str, device: str, language: str) -> str:
+    digest = hashlib.sha1(normalize_keyword(keyword).encode()).hexdigest()
+    return f"serp:{engine}:{region.lower()}:{device.lower()}:{language.lower()}:{digest}"
+
+
+class SerpCache:
+    """Parsed SERPs shared across projects that track the same query.
+
+    Entries hold the results parsed so far, how many pages were fetched and
+    whether the engine's pages were exhausted, so a later caller that needs
+    deeper results can resume instead of starting over.
+
+    Used from the scraper loop, so it talks to Redis through an asyncio client.
+    """
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = SERP_CACHE_TTL, max_entries: int = SERP_CACHE_MAX_ENTRIES):
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pid = None
+        self._client = None
+
+    @property
+    def client(self):
+        # The asyncio client belongs to the scraper loop of this process.
+        if self._pid != os.getpid():
+            self._client = async_redis(self.url)
+            self._pid = os.getpid()
+        return self._client
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get(self, key: str) -> dict | None:
+        if not self.enabled:
+            return None
+        raw = await self.client.get(key)
+        if raw is None:
+            return None
+        await self.client.zadd(LRU_INDEX_KEY, {key: time.time()})
+        return json.loads(raw)
+
+    async def set(self, key: str, results: list[dict], pages: int, complete: bool):
+        if not self.enabled:
+            return
+        entry = json.dumps({"results": results, "pages": pages, "complete": complete})
+        async with self.client.pipeline() as pipe:
+            pipe.set(key, entry, ex=self.ttl)
+            pipe.zadd(LRU_INDEX_KEY, {key: time.time()})
+            await pipe.execute()
+        await self._evict()
+
+    async def _evict(self):
+        # Keys that already expired through their TTL only need to leave the index.
+        await self.client.zremrangebyscore(LRU_INDEX_KEY, 0, time.time() - self.ttl)
+        overflow = await self.client.zcard(LRU_INDEX_KEY) - self.max_entries
+        if overflow <= 0:
+            return
+        stale = await self.client.zrange(LRU_INDEX_KEY, 0, overflow - 1)
+        if stale:
+            async with self.client.pipeline() as pipe:
+                pipe.delete(*stale)
+                pipe.zrem(LRU_INDEX_KEY, *stale)
+                await pipe.execute()
+
+
+serp_cache = SerpCache()
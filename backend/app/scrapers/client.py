@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+
+import httpx
+import redis.asyncio as aioredis
+
+OXYLABS_ENDPOINT = "unblock.oxylabs.io:60000"
+
+MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE = int(os.getenv("SCRAPER_MAX_KEEPALIVE", "100"))
+KEEPALIVE_EXPIRY = float(os.getenv("SCRAPER_KEEPALIVE_EXPIRY", "60"))
+REQUEST_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "30"))
+# Connections per asyncio Redis client on the loop (SERP cache, rate limiter).
+# Fetches beyond that wait for a free one instead of failing with "Too many connections".
+REDIS_MAX_CONNECTIONS = int(os.getenv("SCRAPER_REDIS_MAX_CONNECTIONS", "50"))
+
+# One event loop and one pooled client per worker process. Celery forks its
+# pool children after import, so both are created lazily and rebuilt whenever
+# the pid changes.
+_lock = threading.Lock()
+_pid = None
+_loop = None
+_client = None
+
+
+def _proxy_url() -> str:
+    username = os.getenv("OXYLABS_USER")
+    password = os.getenv("OXYLABS_PASSWORD")
+    return f"http://{username}:{password}@{OXYLABS_ENDPOINT}"
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        proxy=_proxy_url(),
+        verify=False,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def async_redis(url: str) -> aioredis.Redis:
+    """asyncio Redis client for use on the scraper loop, with a blocking connection pool."""
+    pool = aioredis.BlockingConnectionPool.from_url(url, max_connections=REDIS_MAX_CONNECTIONS)
+    return aioredis.Redis(connection_pool=pool)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, starting its thread on first use."""
+    global _pid, _loop, _client
+    with _lock:
+        if _loop is None or _pid != os.getpid():
+            _pid = os.getpid()
+            _client = None
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="scraper-loop", daemon=True).start()
+        return _loop
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client. Must be called from the scraper loop."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def shutdown():
+    """Close the pooled client and stop this process's loop, if it was ever started."""
+    global _loop
+    with _lock:
+        loop = _loop if _pid == os.getpid() else None
+        _loop = None
+    if loop is None:
+        return
+    asyncio.run_coroutine_threadsafe(close_client(), loop).result(timeout=REQUEST_TIMEOUT)
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,40 @@
+import httpx
+
+
+class ScrapeError(Exception):
+    """Base class for scrape failures, split by whether retrying can help."""
+    retryable = False
+
+
+class TransientScrapeError(ScrapeError):
+    """Proxy, network, timeout, 429 or 5xx failure; worth retrying later."""
+    retryable = True
+
+
+class HardScrapeError(ScrapeError):
+    """The proxy or engine rejected the request (4xx); retrying gives the same answer."""
+
+
+class ParseError(ScrapeError):
+    """The page was fetched but no results could be extracted, usually a markup change."""
+
+
+class CircuitOpenError(ScrapeError):
+    """The engine's circuit breaker is open; nothing was requested."""
+    retryable = True
+
+    def __init__(self, engine: str, retry_in: float):
+        super().__init__(f"Circuit open for {engine}, retry in {retry_in:.0f}s")
+        self.engine = engine
+        self.retry_in = retry_in
+
+
+def error_for_status(response: httpx.Response) -> ScrapeError:
+    message = f"{response.status_code} from {response.request.url.host}"
+    if response.status_code == 429 or response.status_code >= 500:
+        return TransientScrapeError(message)
+    return HardScrapeError(message)
+
+
+def error_for_transport(exc: httpx.TransportError) -> ScrapeError:
+    return TransientScrapeError(f"{type(exc).__name__}: {exc}")
@@ -1,43 +1,14 @@
-import requests, os, urllib3
-from bs4 import BeautifulSoup
 from .base import BaseScraper
-
-urllib3.disable_warnings()
+from .parsers import SerpSelectors
 
 class GoogleScraper(BaseScraper):
-    def build_url(self) -> str:
-        q = self.keyword.replace(" ", "+")
-        return f"https://www.google.com/search?q={q}&hl=en&num=100"
-
-    def scrape(self) -> str:
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "x-oxylabs-geo-location": "United States"
-        }
+    engine = "google"
+    geo_location = "United States"
+    selectors = SerpSelectors(
+        result="div.tF2Cxc", link="a", title="h3", snippets=(".VwiC3b", ".IsZvec"),
+    )
 
-        print("[*] Sending request via Oxylabs Web Unblocker...")
-        response = requests.get(
-            self.build_url(),
-            headers=headers,
-            proxies=self.proxies,
-            timeout=30,
-            verify=False,
-        )
-        response.raise_for_status()
-        return response.text
-
-    def parse(self, html: str) -> list[dict]:
-        soup = BeautifulSoup(html, "html.parser")
-        results = []
-        for i, result in enumerate(soup.select("div.tF2Cxc")):
-            link = result.select_one("a")["href"]
-            title = result.select_one("h3")
-            snippet = result.select_one(".VwiC3b") or result.select_one(".IsZvec")
-            if not (title and link): continue
-            results.append({
-                "position": i + 1,
-                "url": link,
-                "title": title.get_text(strip=True),
-                "snippet": snippet.get_text(strip=True) if snippet else "",
-            })
-        return results
+    def build_url(self, offset: int = 0) -> str:
+        q = self.keyword.replace(" ", "+")
+        url = f"https://www.google.com/search?q={q}&hl={self.language}&num=100"
+        return f"{url}&start={offset}" if offset else url
@@ -0,0 +1,121 @@
+from typing import NamedTuple, Optional
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # optional fast backend
+    HTMLParser = None
+
+try:
+    import lxml.html
+    import cssselect  # noqa: F401 - required by lxml's .cssselect()
+except ImportError:  # optional fast backend
+    lxml = None
+
+
+class SerpSelectors(NamedTuple):
+    result: str
+    link: str
+    title: str
+    snippets: tuple[str, ...]
+
+
+# (url, title, snippet) for one result block; any field may be None when the
+# block does not contain it.
+Extracted = tuple[Optional[str], Optional[str], Optional[str]]
+
+
+class BeautifulSoupParser:
+    name = "bs4"
+
+    def extract(self, html: str, selectors: SerpSelectors) -> list[Extracted]:
+        soup = BeautifulSoup(html, "html.parser")
+        blocks = []
+        for result in soup.select(selectors.result):
+            link = result.select_one(selectors.link)
+            title = result.select_one(selectors.title)
+            snippet = next(filter(None, (result.select_one(s) for s in selectors.snippets)), None)
+            blocks.append((
+                link.get("href") if link else None,
+                title.get_text(strip=True) if title else None,
+                snippet.get_text(strip=True) if snippet else None,
+            ))
+        return blocks
+
+
+class SelectolaxParser:
+    name = "selectolax"
+
+    def extract(self, html: str, selectors: SerpSelectors) -> list[Extracted]:
+        tree = HTMLParser(html)
+        blocks = []
+        for result in tree.css(selectors.result):
+            link = result.css_first(selectors.link)
+            title = result.css_first(selectors.title)
+            snippet = next(filter(None, (result.css_first(s) for s in selectors.snippets)), None)
+            blocks.append((
+                link.attributes.get("href") if link else None,
+                title.text(strip=True) if title else None,
+                snippet.text(strip=True) if snippet else None,
+            ))
+        return blocks
+
+
+class LxmlParser:
+    name = "lxml"
+
+    def extract(self, html: str, selectors: SerpSelectors) -> list[Extracted]:
+        tree = lxml.html.fromstring(html)
+        blocks = []
+        for result in tree.cssselect(selectors.result):
+            link = self._first(result, selectors.link)
+            title = self._first(result, selectors.title)
+            snippet = next(filter(lambda el: el is not None, (self._first(result, s) for s in selectors.snippets)), None)
+            blocks.append((
+                link.get("href") if link is not None else None,
+                self._text(title) if title is not None else None,
+                self._text(snippet) if snippet is not None else None,
+            ))
+        return blocks
+
+    @staticmethod
+    def _first(element, selector: str):
+        matches = element.cssselect(selector)
+        return matches[0] if matches else None
+
+    @staticmethod
+    def _text(element) -> str:
+        # Same joining rules as BeautifulSoup's get_text(strip=True)
+        return "".join(part.strip() for part in element.itertext())
+
+
+PARSERS = {
+    "selectolax": (SelectolaxParser, HTMLParser is not None),
+    "lxml": (LxmlParser, lxml is not None),
+    "bs4": (BeautifulSoupParser, True),
+}
+
+_parser = None
+
+
+def get_parser():
+    """Return the configured parser backend, falling back to BeautifulSoup.
+
+    `SERP_PARSER` picks a backend explicitly; otherwise the fastest installed
+    one is used.
+    """
+    global _parser
+    if _parser is None:
+        requested = os.getenv("SERP_PARSER")
+        names = [requested] if requested else list(PARSERS)
+        for name in names:
+            parser_cls, available = PARSERS.get(name, (None, False))
+            if available:
+                _parser = parser_cls()
+                break
+        else:
+            print(f"[!] SERP parser '{requested}' unavailable, falling back to BeautifulSoup")
+            _parser = BeautifulSoupParser()
+    return _parser
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+
+from app.database import REDIS_URL
+from app.scrapers.client import async_redis
+
+# Requests per second allowed by the Oxylabs plan, shared by every worker,
+# and each engine's share of it. A rate of 0 disables that bucket.
+GLOBAL_RATE = float(os.getenv("OXYLABS_RATE_LIMIT", "10"))
+ENGINE_RATES = {
+    "google": float(os.getenv("OXYLABS_GOOGLE_RATE_LIMIT", "6")),
+    "bing": float(os.getenv("OXYLABS_BING_RATE_LIMIT", "3")),
+    "yahoo": float(os.getenv("OXYLABS_YAHOO_RATE_LIMIT", "3")),
+}
+# Seconds of unused budget a bucket may save up for a burst.
+BURST_SECONDS = float(os.getenv("OXYLABS_BURST_SECONDS", "1"))
+# Upper bound of the random delay added to a wait so sleepers don't wake in lockstep.
+WAIT_JITTER = 0.05
+
+# Takes one token from every bucket in KEYS or none of them. ARGV holds
+# (rate, capacity) per key. Returns 0 on success, otherwise the milliseconds
+# until all buckets can serve a token. A bucket's `ts` may lie in the future
+# after a 429, which freezes its refill until then.
+ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local wait, state = 0, {}
+for i, key in ipairs(KEYS) do
+    local rate, capacity = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens, ts = tonumber(bucket[1]) or capacity, tonumber(bucket[2]) or now
+    if now > ts then
+        tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+        ts = now
+    end
+    if tokens < 1 then
+        wait = math.max(wait, ts - now + (1 - tokens) * 1000 / rate)
+    end
+    state[i] = {tokens, ts, capacity / rate * 1000}
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', state[i][1] - 1, 'ts', state[i][2])
+    redis.call('PEXPIRE', key, math.ceil(state[i][2] - now + state[i][3]) + 1000)
+end
+return 0
+"""
+
+# Empties the buckets in KEYS and stops them refilling for ARGV[1] milliseconds.
+PAUSE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local until_ts = now + tonumber(ARGV[1])
+for _, key in ipairs(KEYS) do
+    local ts = tonumber(redis.call('HGET', key, 'ts')) or 0
+    if until_ts > ts then
+        redis.call('HSET', key, 'tokens', 0, 'ts', until_ts)
+        redis.call('PEXPIRE', key, tonumber(ARGV[1]) + 60000)
+    end
+end
+return 0
+"""
+
+
+class RateLimiter:
+    """Redis token buckets shared by all workers: one per engine plus a global one.
+
+    A request needs a token from its engine's bucket and from the global
+    bucket. Callers wait asynchronously for tokens instead of failing, so a
+    burst of tasks is smoothed out rather than turned into 429s and retries.
+    """
+
+    def __init__(self, url: str = REDIS_URL, global_rate: float = GLOBAL_RATE,
+                 engine_rates: dict[str, float] = ENGINE_RATES, burst_seconds: float = BURST_SECONDS):
+        self.url = url
+        self.global_rate = global_rate
+        self.engine_rates = engine_rates
+        self.burst_seconds = burst_seconds
+        self._pid = None
+        self._acquire = None
+        self._pause = None
+
+    def _scripts(self):
+        # The asyncio client belongs to the scraper loop of this process.
+        if self._pid != os.getpid():
+            client = async_redis(self.url)
+            self._acquire = client.register_script(ACQUIRE_SCRIPT)
+            self._pause = client.register_script(PAUSE_SCRIPT)
+            self._pid = os.getpid()
+        return self._acquire, self._pause
+
+    def _buckets(self, engine: str) -> list[tuple[str, float]]:
+        buckets = [(f"ratelimit:oxylabs:{engine}", self.engine_rates.get(engine, 0)),
+                   ("ratelimit:oxylabs:global", self.global_rate)]
+        return [(key, rate) for key, rate in buckets if rate > 0]
+
+    async def acquire(self, engine: str):
+        """Wait until a request to `engine` fits both its own and the global budget."""
+        buckets = self._buckets(engine)
+        if not buckets:
+            return
+        keys = [key for key, _ in buckets]
+        args = []
+        for _, rate in buckets:
+            args += [rate, max(1.0, rate * self.burst_seconds)]
+        acquire, _ = self._scripts()
+        while True:
+            wait_ms = await acquire(keys=keys, args=args)
+            if not wait_ms:
+                return
+            await asyncio.sleep(wait_ms / 1000 + random.uniform(0, WAIT_JITTER))
+
+    async def pause(self, engine: str, seconds: float):
+        """Stop handing out tokens for `engine` after the proxy answered 429.
+
+        The global bucket is paused too: a 429 means the plan-wide cap was hit.
+        """
+        keys = [key for key, _ in self._buckets(engine)]
+        if keys:
+            _, pause = self._scripts()
+            await pause(keys=keys, args=[int(seconds * 1000)])
+
+
+rate_limiter = RateLimiter()
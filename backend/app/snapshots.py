@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import case, func, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import session_scope
+from app.models import SerpDomain, SerpSnapshot, SearchEngine, DeviceType
+from app.scrapers.cache import normalize_keyword
+from app.scrapers.matching import split_url, unwrap_redirect
+
+# Approximate share of clicks per organic position, used to weight visibility.
+CTR_BY_POSITION = {1: 0.28, 2: 0.15, 3: 0.11, 4: 0.08, 5: 0.07, 6: 0.05, 7: 0.04, 8: 0.03, 9: 0.03, 10: 0.02}
+
+# domain -> SerpDomain.id, filled lazily per process; ids never change once assigned.
+# Kept as an LRU so long-lived workers do not hold every domain ever seen.
+DOMAIN_CACHE_SIZE = int(os.getenv("SERP_DOMAIN_CACHE_SIZE", "100000"))
+_domain_ids: OrderedDict[str, int] = OrderedDict()
+_domain_ids_lock = threading.Lock()
+
+
+def domain_of(url: str) -> str:
+    """Host of `url` without `www.`; engine redirect links count as the site they lead to."""
+    labels, _ = split_url(url)
+    return ".".join(reversed(labels))
+
+
+def resolve_domain_ids(domains: set[str]) -> dict[str, int]:
+    ids = {}
+    with _domain_ids_lock:
+        for domain in domains:
+            if domain in _domain_ids:
+                _domain_ids.move_to_end(domain)
+                ids[domain] = _domain_ids[domain]
+    missing = [domain for domain in domains if domain not in ids]
+    if missing:
+        with session_scope() as db:
+            db.execute(insert(SerpDomain).values([{"domain": d} for d in missing]).on_conflict_do_nothing(index_elements=["domain"]))
+            ids.update(db.query(SerpDomain.domain, SerpDomain.id).filter(SerpDomain.domain.in_(missing)))
+        with _domain_ids_lock:
+            _domain_ids.update((domain, ids[domain]) for domain in missing)
+            while len(_domain_ids) > DOMAIN_CACHE_SIZE:
+                _domain_ids.popitem(last=False)
+    return ids
+
+
+def build_snapshot(engine: str, keyword: str, region: str, device: str, language: str, results: list[dict]) -> dict:
+    """Encode parsed results as a `SerpSnapshot` row, with engine redirect links stored as their targets."""
+    urls = [unwrap_redirect(result["url"]) for result in results]
+    domains = [domain_of(url) for url in urls]
+    ids = resolve_domain_ids(set(domains))
+    payload = [[url, result["title"]] for url, result in zip(urls, results)]
+    return {
+        "search_engine": SearchEngine[engine.upper()],
+        "query": normalize_keyword(keyword),
+        "region": region,
+        "device": DeviceType[device.upper()],
+        "language": language,
+        "domain_ids": [ids[domain] for domain in domains],
+        "positions": [result["position"] for result in results],
+        "payload": zlib.compress(json.dumps(payload).encode()),
+    }
+
+
+def decode_payload(snapshot: SerpSnapshot) -> list[dict]:
+    entries = json.loads(zlib.decompress(snapshot.payload))
+    return [
+        {"position": position, "url": url, "title": title}
+        for position, (url, title) in zip(snapshot.positions, entries)
+    ]
+
+
+def _entries():
+    return func.unnest(SerpSnapshot.domain_ids, SerpSnapshot.positions).table_valued("domain_id", "position").render_derived("entry")
+
+
+def competitor_positions(db: Session, engine: SearchEngine, query: str, region: str, since: datetime, limit: int = 20) -> list[dict]:
+    """Domains ranking for a query since `since`, best average position first."""
+    entry = _entries()
+    rows = (
+        db.query(
+            SerpDomain.domain,
+            func.count().label("appearances"),
+            func.avg(entry.c.position).label("average_position"),
+            func.min(entry.c.position).label("best_position"),
+        )
+        .select_from(SerpSnapshot)
+        .join(entry, true())
+        .join(SerpDomain, SerpDomain.id == entry.c.domain_id)
+        .filter(
+            SerpSnapshot.search_engine == engine,
+            SerpSnapshot.query == normalize_keyword(query),
+            SerpSnapshot.region == region,
+            SerpSnapshot.fetched_at >= since,
+        )
+        .group_by(SerpDomain.domain)
+        .order_by(func.avg(entry.c.position))
+        .limit(limit)
+    )
+    return [
+        {"domain": domain, "appearances": appearances, "average_position": round(float(average), 2), "best_position": best}
+        for domain, appearances, average, best in rows
+    ]
+
+
+def visibility_trend(db: Session, domain: str, queries: list[str], since: datetime) -> list[dict]:
+    """Daily CTR-weighted visibility of `domain` across `queries`, as a 0-100 score."""
+    if not queries:
+        return []
+    entry = _entries()
+    day = func.date_trunc("day", SerpSnapshot.fetched_at)
+    weight = case(CTR_BY_POSITION, value=entry.c.position, else_=0)
+    ctr_total = sum(CTR_BY_POSITION.values())
+    rows = (
+        db.query(
+            day,
+            func.sum(case((SerpDomain.domain == domain, weight), else_=0)),
+            func.count(func.distinct(SerpSnapshot.id)),
+        )
+        .select_from(SerpSnapshot)
+        .join(entry, true())
+        .join(SerpDomain, SerpDomain.id == entry.c.domain_id)
+        .filter(SerpSnapshot.query.in_([normalize_keyword(q) for q in queries]), SerpSnapshot.fetched_at >= since)
+        .group_by(day)
+        .order_by(day)
+    )
+    return [
+        {"date": date.date().isoformat(), "visibility": round(float(score) / (snapshots * ctr_total) * 100, 2)}
+        for date, score, snapshots in rows
+    ]
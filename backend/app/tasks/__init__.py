@@ -1,4 +1,9 @@
 # tasks/__init__.py
-from .scraper import run_rank_tracking_task, run_keyword_scrape
+from .scraper import run_rank_tracking_task, run_grouped_rank_tracking, run_keyword_scrape, run_keyword_batch_scrape, run_serp_group_scrape
+from .scheduler import schedule_due_keywords
+from .fairshare import drain_fair_queue
+from .partitions import create_ranking_partitions
+from .rollups import downsample_ranking_history
+from .dashboard import refresh_dashboard_stats
 
-__all__ = ["run_rank_tracking_task", "run_keyword_scrape"]
\ No newline at end of file
+__all__ = ["run_rank_tracking_task", "run_grouped_rank_tracking", "run_keyword_scrape", "run_keyword_batch_scrape", "run_serp_group_scrape", "schedule_due_keywords", "drain_fair_queue", "create_ranking_partitions", "downsample_ranking_history", "refresh_dashboard_stats"]
\ No newline at end of file
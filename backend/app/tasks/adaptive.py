@@ -0,0 +1,137 @@
+# tasks/adaptive.py
+import os
+from datetime import timedelta
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from app.models import Keyword, KeywordRanking, Project
+
+# Base interval and the (shortest, longest) adaptive interval for each
+# project frequency, in hours. Adaptive scheduling never leaves these bounds.
+# Nothing goes below 24h: a keyword is checked at most once per UTC day
+# (app.tasks.runs.ScrapeLocks), so a shorter interval would only be skipped.
+FREQUENCY_HOURS = {
+    "daily": (24, (24, 96)),
+    "weekly": (168, (72, 336)),
+    "monthly": (720, (336, 1440)),
+}
+DEFAULT_FREQUENCY = "weekly"
+
+HISTORY_CHECKS = int(os.getenv("ADAPTIVE_HISTORY_CHECKS", "5"))
+STABLE_SPREAD = int(os.getenv("ADAPTIVE_STABLE_SPREAD", "1"))
+VOLATILE_SPREAD = int(os.getenv("ADAPTIVE_VOLATILE_SPREAD", "5"))
+GROWTH_FACTOR = float(os.getenv("ADAPTIVE_GROWTH_FACTOR", "1.5"))
+# Positions around the bottom of page 1, where a small move changes clicks most.
+PAGE_ONE_BOUNDARY = (8, 13)
+
+
+def frequency_hours(frequency: str | None) -> tuple[float, tuple[float, float]]:
+    return FREQUENCY_HOURS.get(frequency or DEFAULT_FREQUENCY, FREQUENCY_HOURS[DEFAULT_FREQUENCY])
+
+
+def next_interval(current: float | None, frequency: str | None, positions: list[int]) -> float:
+    """Next check interval in hours given the latest positions, newest first.
+
+    Stable keywords back off geometrically, volatile ones halve their
+    interval and keywords near the page-1 boundary are checked as often as
+    the project's frequency allows.
+    """
+    base, (shortest, longest) = frequency_hours(frequency)
+    interval = current or base
+
+    if len(positions) >= 2:
+        spread = max(positions) - min(positions)
+        if PAGE_ONE_BOUNDARY[0] <= positions[0] <= PAGE_ONE_BOUNDARY[1]:
+            interval = shortest
+        elif spread >= VOLATILE_SPREAD:
+            interval = interval / 2
+        elif len(positions) >= HISTORY_CHECKS and spread <= STABLE_SPREAD:
+            interval = interval * GROWTH_FACTOR
+
+    return min(longest, max(shortest, interval))
+
+
+def recent_positions(db: Session, keyword_ids: list[int]) -> dict[int, list[int]]:
+    """Last HISTORY_CHECKS recorded positions per keyword, newest first."""
+    recency = func.row_number().over(
+        partition_by=KeywordRanking.keyword_id, order_by=KeywordRanking.checked_at.desc()
+    ).label("recency")
+    history = (
+        db.query(KeywordRanking.keyword_id, KeywordRanking.position, recency)
+        .filter(KeywordRanking.keyword_id.in_(keyword_ids))
+        .subquery()
+    )
+    positions = {}
+    rows = (
+        db.query(history.c.keyword_id, history.c.position)
+        .filter(history.c.recency <= HISTORY_CHECKS)
+        .order_by(history.c.keyword_id, history.c.recency)
+    )
+    for keyword_id, position in rows:
+        positions.setdefault(keyword_id, []).append(position)
+    return positions
+
+
+def record_checks(db: Session, rows: list[dict]) -> int:
+    """Stamp `last_checked` and the next check time from rank volatility on keywords
+    whose check results (`keyword_id`, `checked_at`) were just written.
+
+    Runs in the writing transaction, so a keyword is only rescheduled once its
+    check is stored; the scheduler's lease makes it due again otherwise.
+    Older checks (e.g. backfills) never move a keyword's schedule back.
+    """
+    checked = {}
+    for row in rows:
+        checked[row["keyword_id"]] = max(row["checked_at"], checked.get(row["keyword_id"], row["checked_at"]))
+    positions = recent_positions(db, list(checked))
+    keywords = (
+        db.query(Keyword.id, Keyword.last_checked, Keyword.check_interval_hours, Project.rank_check_frequency)
+        .join(Project, Keyword.project_id == Project.id)
+        .filter(Keyword.id.in_(checked))
+        .order_by(Keyword.id)
+    )
+    updates = []
+    for keyword_id, last_checked, current, frequency in keywords:
+        checked_at = checked[keyword_id]
+        if last_checked and last_checked >= checked_at:
+            continue
+        interval = next_interval(current, frequency, positions.get(keyword_id, []))
+        updates.append({
+            "id": keyword_id,
+            "last_checked": checked_at,
+            "check_interval_hours": interval,
+            "next_check_at": checked_at + timedelta(hours=interval),
+        })
+    if updates:
+        db.execute(update(Keyword), updates)
+    return len(updates)
+
+
+def base_hours_sql():
+    frequency = func.coalesce(Project.rank_check_frequency, DEFAULT_FREQUENCY)
+    return case({name: base for name, (base, _) in FREQUENCY_HOURS.items()}, value=frequency, else_=FREQUENCY_HOURS[DEFAULT_FREQUENCY][0])
+
+
+def savings_report(db: Session) -> dict:
+    """Proxy calls per day under adaptive intervals compared with fixed frequencies."""
+    base = base_hours_sql()
+    keywords, fixed, adaptive = (
+        db.query(
+            func.count(Keyword.id),
+            func.coalesce(func.sum(24.0 / base), 0),
+            func.coalesce(func.sum(24.0 / func.coalesce(Keyword.check_interval_hours, base)), 0),
+        )
+        .join(Project, Keyword.project_id == Project.id)
+        .filter(Keyword.is_paused.is_(False), Project.is_paused.is_(False))
+        .one()
+    )
+    fixed, adaptive = float(fixed), float(adaptive)
+    return {
+        "keywords": keywords,
+        "fixed_checks_per_day": round(fixed, 1),
+        "adaptive_checks_per_day": round(adaptive, 1),
+        "saved_checks_per_day": round(fixed - adaptive, 1),
+        "saved_checks_per_month": round((fixed - adaptive) * 30),
+        "saved_percent": round((fixed - adaptive) / fixed * 100, 1) if fixed else 0.0,
+    }
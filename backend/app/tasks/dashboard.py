@@ -0,0 +1,310 @@
+# tasks/dashboard.py
+import json
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, event, func, tuple_
+from sqlalchemy.orm import Session
+
+from app.celery_worker import celery_app
+from app.database import redis_client, session_scope
+from app.models import DeviceType, Keyword, KeywordLatestRank, SearchEngine
+from app.snapshots import CTR_BY_POSITION
+from app.tasks.latest_rank import last_found, latest_by_key
+
+# Daily snapshots kept per project for the dashboard trend chart.
+TREND_DAYS = int(os.getenv("DASHBOARD_TREND_DAYS", "90"))
+
+# Summed per project, then across a user's projects. `ranked` counts
+# (keyword, engine, region, device) series with a current position.
+COUNTERS = ("keywords", "ranked", "position_sum", "top10", "up", "down")
+
+
+def _stats_key(project_id) -> str:
+    return f"dashboard:project:{project_id}"
+
+
+def _top_key(project_id) -> str:
+    return f"dashboard:project:{project_id}:top"  # zset: series -> current position
+
+
+def _trend_key(project_id) -> str:
+    return f"dashboard:project:{project_id}:trend"  # hash: ISO date -> stats snapshot
+
+
+def series_member(keyword_id, engine: SearchEngine, region: str, device: DeviceType) -> str:
+    return f"{keyword_id}|{engine.name}|{region}|{device.name}"
+
+
+def parse_series(member: str) -> tuple:
+    keyword_id, engine, region, device = member.split("|", 3)
+    return int(keyword_id), SearchEngine[engine], region, DeviceType[device]
+
+
+def _ctr(position) -> float:
+    return CTR_BY_POSITION.get(position, 0.0) if position else 0.0
+
+
+def _contribution(position, change) -> dict:
+    """What one series with this current position and change adds to its project's counters."""
+    if position is None:
+        return {}
+    return {
+        "ranked": 1,
+        "position_sum": position,
+        "top10": position <= 10,
+        "up": (change or 0) > 0,
+        "down": (change or 0) < 0,
+        "visibility": _ctr(position),
+    }
+
+
+class DashboardStats:
+    """Per-project dashboard counters in Redis, moved incrementally as rankings land.
+
+    Workers turn each change of a keyword's current position into counter
+    deltas, applied once the ranking transaction commits. Reads for a user
+    add up the hashes of that user's projects, so no dashboard request
+    aggregates rankings. `refresh()` recomputes everything from
+    keyword_latest_rank periodically to undo drift (lost updates, flushed Redis).
+    """
+
+    def __init__(self, client=redis_client, trend_days: int = TREND_DAYS):
+        self.client = client
+        self.trend_days = trend_days
+
+    # -- writes ------------------------------------------------------------
+
+    def record_rankings(self, db: Session, rows: list[dict]):
+        """Writer hook: must run before keyword_latest_rank is upserted, to see the old positions."""
+        latest = latest_by_key(rows)
+        if not latest:
+            return
+        key_columns = (KeywordLatestRank.keyword_id, KeywordLatestRank.search_engine,
+                       KeywordLatestRank.region, KeywordLatestRank.device)
+        current = {
+            (rank.keyword_id, rank.search_engine, rank.region, rank.device): rank
+            for rank in db.query(KeywordLatestRank).filter(tuple_(*key_columns).in_(list(latest))).with_for_update()
+        }
+        deltas, positions, removed = defaultdict(lambda: defaultdict(float)), defaultdict(dict), defaultdict(list)
+        for key, row in latest.items():
+            old = current.get(key)
+            if old and row["checked_at"] <= old.checked_at:
+                continue
+            # Same change as upsert_latest_ranks stores.
+            position, change = row["position"], row["change"]
+            if old:
+                previous = last_found(old.position, old.previous_position)
+                change = previous - position if previous is not None and position is not None else None
+            delta = deltas[row["project_id"]]
+            for field, value in _contribution(position, change).items():
+                delta[field] += value
+            for field, value in (_contribution(old.position, old.change) if old else {}).items():
+                delta[field] -= value
+            if position is None:
+                removed[row["project_id"]].append(series_member(*key))
+            else:
+                positions[row["project_id"]][series_member(*key)] = position
+        self.apply_after_commit(db, deltas, positions, removed)
+
+    def latest_series(self, db: Session, keyword_ids: list[int], lock: bool = False) -> dict:
+        """keyword_latest_rank state of `keyword_ids`: series key -> (project id, position, change)."""
+        rank = KeywordLatestRank
+        query = db.query(rank.keyword_id, rank.search_engine, rank.region, rank.device,
+                         rank.project_id, rank.position, rank.change).filter(rank.keyword_id.in_(keyword_ids))
+        if lock:
+            query = query.with_for_update()
+        return {
+            (keyword_id, engine, region, device): (project_id, position, change)
+            for keyword_id, engine, region, device, project_id, position, change in query
+        }
+
+    def record_rebuilt(self, db: Session, before: dict, after: dict):
+        """Move the counters by how a rebuild changed keyword_latest_rank (see `latest_series`)."""
+        deltas, positions, removed = defaultdict(lambda: defaultdict(float)), defaultdict(dict), defaultdict(list)
+        for key in before.keys() | after.keys():
+            old, new = before.get(key), after.get(key)
+            if old == new:
+                continue
+            project_id = (new or old)[0]
+            delta = deltas[project_id]
+            for field, value in (_contribution(*new[1:]) if new else {}).items():
+                delta[field] += value
+            for field, value in (_contribution(*old[1:]) if old else {}).items():
+                delta[field] -= value
+            if new and new[1] is not None:
+                positions[project_id][series_member(*key)] = new[1]
+            else:
+                removed[project_id].append(series_member(*key))
+        self.apply_after_commit(db, deltas, positions, removed)
+
+    def keyword_added(self, db: Session, project_id: int):
+        self.apply_after_commit(db, {project_id: {"keywords": 1}})
+
+    def keyword_removed(self, db: Session, keyword: Keyword):
+        """Call before deleting `keyword`: takes its series out of the project's counters."""
+        delta = defaultdict(float, keywords=-1)
+        removed = []
+        for rank in db.query(KeywordLatestRank).filter(KeywordLatestRank.keyword_id == keyword.id):
+            for field, value in _contribution(rank.position, rank.change).items():
+                delta[field] -= value
+            removed.append(series_member(rank.keyword_id, rank.search_engine, rank.region, rank.device))
+        self.apply_after_commit(db, {keyword.project_id: delta}, removed={keyword.project_id: removed})
+
+    def project_removed(self, db: Session, project_id: int):
+        self._after_commit(db, self.forget, project_id)
+
+    def apply_after_commit(self, db: Session, deltas: dict, positions: dict | None = None, removed: dict | None = None):
+        # Redis is not part of the transaction: only count what actually got committed.
+        self._after_commit(db, self.apply, deltas, positions, removed)
+
+    def _after_commit(self, db: Session, callback, *args):
+        def run(session):
+            # The rows are committed by now, so a Redis error must not fail the caller
+            # (the ranking writer would re-queue them); refresh() repairs the counters.
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[!] Dashboard stats update failed: {str(e)}")
+        event.listen(db, "after_commit", run, once=True)
+
+    def apply(self, deltas: dict, positions: dict | None = None, removed: dict | None = None):
+        positions, removed = positions or {}, removed or {}
+        projects = sorted(set(deltas) | set(positions) | set(removed))
+        if not projects:
+            return
+        with self.client.pipeline() as pipe:
+            for project_id in projects:
+                for field, value in deltas.get(project_id, {}).items():
+                    if field == "visibility":
+                        pipe.hincrbyfloat(_stats_key(project_id), field, value)
+                    elif value:
+                        pipe.hincrby(_stats_key(project_id), field, int(value))
+                if positions.get(project_id):
+                    pipe.zadd(_top_key(project_id), positions[project_id])
+                if removed.get(project_id):
+                    pipe.zrem(_top_key(project_id), *removed[project_id])
+            for project_id in projects:
+                pipe.hgetall(_stats_key(project_id))
+            stats = pipe.execute()[-len(projects):]
+        self._snapshot(dict(zip(projects, stats)))
+
+    def _snapshot(self, stats: dict, day: date | None = None):
+        """Store each project's current counters as today's trend point."""
+        day = (day or datetime.utcnow().date()).isoformat()
+        with self.client.pipeline(transaction=False) as pipe:
+            for project_id, values in stats.items():
+                pipe.hset(_trend_key(project_id), day, json.dumps(values))
+            pipe.execute()
+
+    def forget(self, project_id: int):
+        self.client.delete(_stats_key(project_id), _top_key(project_id), _trend_key(project_id))
+
+    # -- reads -------------------------------------------------------------
+
+    def summary(self, project_ids: list[int]) -> dict:
+        """Counters summed over `project_ids`."""
+        with self.client.pipeline(transaction=False) as pipe:
+            for project_id in project_ids:
+                pipe.hgetall(_stats_key(project_id))
+            rows = pipe.execute()
+        return _add_up(rows)
+
+    def trend(self, project_ids: list[int], days: int) -> list[tuple[date, dict]]:
+        """Daily counters summed over `project_ids` for the last `days` days; a
+        project without a snapshot on some day counts with its previous one."""
+        with self.client.pipeline(transaction=False) as pipe:
+            for project_id in project_ids:
+                pipe.hgetall(_trend_key(project_id))
+            snapshots = [{date.fromisoformat(day): json.loads(raw) for day, raw in trend.items()} for trend in pipe.execute()]
+
+        today = datetime.utcnow().date()
+        first = today - timedelta(days=days - 1)
+        points = []
+        last = [
+            next((trend[day] for day in sorted(trend, reverse=True) if day < first), {})
+            for trend in snapshots
+        ]
+        for offset in range(days):
+            day = first + timedelta(days=offset)
+            last = [trend.get(day, previous) for trend, previous in zip(snapshots, last)]
+            points.append((day, _add_up(last)))
+        return points
+
+    def top(self, project_ids: list[int], limit: int) -> list[tuple[int, str]]:
+        """Best-positioned series across `project_ids` as (project id, member) pairs."""
+        with self.client.pipeline(transaction=False) as pipe:
+            for project_id in project_ids:
+                pipe.zrange(_top_key(project_id), 0, limit - 1, withscores=True)
+            ranked = [
+                (position, project_id, member)
+                for project_id, members in zip(project_ids, pipe.execute())
+                for member, position in members
+            ]
+        return [(project_id, member) for _, project_id, member in sorted(ranked)[:limit]]
+
+    # -- reconciliation ----------------------------------------------------
+
+    def refresh(self, db: Session):
+        """Recompute every project's counters and top positions from SQL."""
+        stats = defaultdict(lambda: dict.fromkeys((*COUNTERS, "visibility"), 0))
+        for project_id, keywords in db.query(Keyword.project_id, func.count()).group_by(Keyword.project_id):
+            stats[project_id]["keywords"] = keywords
+
+        rank = KeywordLatestRank
+        visibility = case(CTR_BY_POSITION, value=rank.position, else_=0.0)
+        totals = db.query(
+            rank.project_id,
+            func.count(),
+            func.sum(rank.position),
+            func.count().filter(rank.position <= 10),
+            func.count().filter(rank.change > 0),
+            func.count().filter(rank.change < 0),
+            func.sum(visibility),
+        ).filter(rank.position.isnot(None)).group_by(rank.project_id)
+        for project_id, ranked, position_sum, top10, up, down, visible in totals:
+            stats[project_id].update(ranked=ranked, position_sum=position_sum, top10=top10, up=up, down=down,
+                                     visibility=round(float(visible), 4))
+
+        positions = defaultdict(dict)
+        series = db.query(rank.project_id, rank.keyword_id, rank.search_engine, rank.region, rank.device, rank.position)
+        for project_id, *key, position in series.filter(rank.position.isnot(None)).yield_per(5000):
+            positions[project_id][series_member(*key)] = position
+
+        cutoff = (datetime.utcnow().date() - timedelta(days=self.trend_days)).isoformat()
+        with self.client.pipeline() as pipe:
+            for project_id, values in stats.items():
+                pipe.delete(_stats_key(project_id), _top_key(project_id))
+                pipe.hset(_stats_key(project_id), mapping=values)
+                if positions[project_id]:
+                    pipe.zadd(_top_key(project_id), positions[project_id])
+            pipe.execute()
+        self._snapshot({project_id: values for project_id, values in stats.items()})
+        for project_id in stats:
+            stale = [day for day in self.client.hkeys(_trend_key(project_id)) if day < cutoff]
+            if stale:
+                self.client.hdel(_trend_key(project_id), *stale)
+        return len(stats)
+
+
+def _add_up(rows: list[dict]) -> dict:
+    total = dict.fromkeys(COUNTERS, 0)
+    total["visibility"] = 0.0
+    for row in rows:
+        for field in COUNTERS:
+            total[field] += int(row.get(field, 0) or 0)
+        total["visibility"] += float(row.get("visibility", 0) or 0)
+    return total
+
+
+dashboard_stats = DashboardStats()
+
+
+@celery_app.task
+def refresh_dashboard_stats():
+    """Periodic (Celery beat) entry point: rebuild dashboard counters from SQL."""
+    with session_scope() as db:
+        projects = dashboard_stats.refresh(db)
+    print(f"[✓] Refreshed dashboard stats for {projects} projects")
+    return projects
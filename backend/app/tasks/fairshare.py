@@ -0,0 +1,176 @@
+# tasks/fairshare.py
+import json
+import os
+import time
+import uuid
+
+from celery.signals import task_postrun
+
+from app.celery_worker import celery_app
+from app.database import redis_client
+
+# Jobs an owner may dispatch per round, by subscription plan.
+PLAN_WEIGHTS = {
+    "starter": 1,
+    "growth": 2,
+    "pro": 4,
+}
+DEFAULT_WEIGHT = PLAN_WEIGHTS["starter"]
+
+# Upper bound on fair-share jobs sitting in the broker or running at once.
+# Kept small so a newly queued job never waits behind more than this.
+INFLIGHT_CAP = int(os.getenv("FAIRSHARE_INFLIGHT_CAP", "200"))
+# A job still in flight after this long (lost worker) stops counting against the cap.
+INFLIGHT_TIMEOUT = int(os.getenv("FAIRSHARE_INFLIGHT_TIMEOUT", "900"))
+DRAIN_SECONDS = float(os.getenv("FAIRSHARE_DRAIN_SECONDS", "5"))
+
+OWNERS_KEY = "fairshare:owners"  # hash: owner id -> weight
+CURSOR_KEY = "fairshare:cursor"  # rotates which owner goes first
+INFLIGHT_KEY = "fairshare:inflight"  # zset: task id -> deadline
+DRAIN_LOCK_KEY = "fairshare:drain"
+
+
+def _projects_key(owner_id) -> str:
+    return f"fairshare:projects:{owner_id}"
+
+
+def _cursor_key(owner_id) -> str:
+    return f"fairshare:cursor:{owner_id}"
+
+
+def _queue_key(owner_id, project_id) -> str:
+    return f"fairshare:queue:{owner_id}:{project_id}"
+
+
+class FairShareQueue:
+    """Per-owner, per-project job queues in Redis drained by weighted round robin.
+
+    Instead of going straight to the broker, jobs wait here and the drain
+    task moves at most `inflight_cap` of them into Celery at a time. Each
+    round gives every owner with queued work `weight` jobs, taken round robin
+    across that owner's projects, so a large crawl cannot push a small
+    account's checks to the back of the line.
+    """
+
+    def __init__(self, client=redis_client, inflight_cap: int = INFLIGHT_CAP, inflight_timeout: int = INFLIGHT_TIMEOUT):
+        self.client = client
+        self.inflight_cap = inflight_cap
+        self.inflight_timeout = inflight_timeout
+
+    def enqueue(self, owner_id: int, plan: str | None, project_id: int, task_name: str, jobs: list[dict]):
+        """Queue one `task_name` call per kwargs dict in `jobs` for `project_id`."""
+        if not jobs:
+            return
+        weight = PLAN_WEIGHTS.get((plan or "").lower(), DEFAULT_WEIGHT)
+        with self.client.pipeline() as pipe:
+            pipe.rpush(_queue_key(owner_id, project_id), *(json.dumps({"task": task_name, "kwargs": kwargs}) for kwargs in jobs))
+            pipe.sadd(_projects_key(owner_id), project_id)
+            pipe.hset(OWNERS_KEY, owner_id, weight)
+            pipe.execute()
+
+    def inflight(self) -> int:
+        self.client.zremrangebyscore(INFLIGHT_KEY, "-inf", time.time())
+        return self.client.zcard(INFLIGHT_KEY)
+
+    def release(self, task_id: str):
+        self.client.zrem(INFLIGHT_KEY, task_id)
+
+    def pending(self) -> dict[str, int]:
+        """Queued jobs per owner."""
+        counts = {}
+        for owner_id in self.client.hkeys(OWNERS_KEY):
+            counts[owner_id] = sum(
+                self.client.llen(_queue_key(owner_id, project_id))
+                for project_id in self.client.smembers(_projects_key(owner_id))
+            )
+        return counts
+
+    def _take(self, owner_id: str, count: int) -> list[dict]:
+        """Pop up to `count` jobs for one owner, one per project in turn."""
+        jobs = []
+        projects = sorted(self.client.smembers(_projects_key(owner_id)), key=int)
+        if projects:
+            start = self.client.incr(_cursor_key(owner_id)) % len(projects)
+            projects = projects[start:] + projects[:start]
+        while projects and len(jobs) < count:
+            for project_id in list(projects):
+                if len(jobs) == count:
+                    break
+                raw = self.client.lpop(_queue_key(owner_id, project_id))
+                if raw is None:
+                    projects.remove(project_id)
+                    self._forget_project(owner_id, project_id)
+                    continue
+                jobs.append(json.loads(raw))
+        if not projects:
+            self._forget_owner(owner_id)
+        return jobs
+
+    def _forget_project(self, owner_id, project_id):
+        # Re-add if a job was queued between the empty pop and the removal.
+        self.client.srem(_projects_key(owner_id), project_id)
+        if self.client.llen(_queue_key(owner_id, project_id)):
+            self.client.sadd(_projects_key(owner_id), project_id)
+
+    def _forget_owner(self, owner_id):
+        if self.client.scard(_projects_key(owner_id)):
+            return
+        weight = self.client.hget(OWNERS_KEY, owner_id)
+        self.client.hdel(OWNERS_KEY, owner_id)
+        self.client.delete(_cursor_key(owner_id))
+        if self.client.scard(_projects_key(owner_id)):
+            self.client.hset(OWNERS_KEY, owner_id, weight or DEFAULT_WEIGHT)
+
+    def drain(self) -> int:
+        """Send queued jobs to Celery, weighted round robin across owners, up to the in-flight cap."""
+        capacity = self.inflight_cap - self.inflight()
+        dispatched = 0
+        while capacity > 0:
+            weights = self.client.hgetall(OWNERS_KEY)
+            if not weights:
+                break
+            owners = sorted(weights, key=int)
+            start = self.client.incr(CURSOR_KEY) % len(owners)
+            round_dispatched = 0
+            for owner_id in owners[start:] + owners[:start]:
+                jobs = self._take(owner_id, min(int(weights[owner_id]), capacity))
+                for job in jobs:
+                    self._dispatch(job)
+                capacity -= len(jobs)
+                round_dispatched += len(jobs)
+                if capacity <= 0:
+                    break
+            if not round_dispatched:
+                break
+            dispatched += round_dispatched
+        return dispatched
+
+    def _dispatch(self, job: dict):
+        task_id = str(uuid.uuid4())
+        self.client.zadd(INFLIGHT_KEY, {task_id: time.time() + self.inflight_timeout})
+        celery_app.tasks[job["task"]].apply_async(kwargs=job["kwargs"], task_id=task_id)
+
+
+fair_queue = FairShareQueue()
+
+
+@task_postrun.connect
+def release_inflight(task_id=None, state=None, **kwargs):
+    # Retrying jobs keep their slot; the timeout reclaims it if they never finish.
+    if state != "RETRY":
+        fair_queue.release(task_id)
+
+
+@celery_app.task
+def drain_fair_queue():
+    """Periodic (Celery beat) entry point: move queued scrape jobs into the broker fairly."""
+    lock = redis_client.lock(DRAIN_LOCK_KEY, timeout=max(DRAIN_SECONDS * 6, 30))
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        dispatched = fair_queue.drain()
+    finally:
+        lock.release()
+    if dispatched:
+        print(f"[✓] Dispatched {dispatched} fair-share jobs")
+    return dispatched
@@ -0,0 +1,121 @@
+# tasks/latest_rank.py
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import KeywordLatestRank
+
+KEY_FIELDS = ("keyword_id", "search_engine", "region", "device")
+
+
+def last_found(position, previous_position):
+    return position if position is not None else previous_position
+
+
+def latest_by_key(rows: list[dict]) -> dict[tuple, dict]:
+    """Collapse ranking rows to the newest one per (keyword, engine, region, device).
+
+    A row without a position is a check that did not find the project: it
+    still becomes the current state, while `previous_position` always holds
+    the last position found before it and `best_position` the best found.
+    """
+    latest = {}
+    for row in rows:
+        key = tuple(row[field] for field in KEY_FIELDS)
+        current = latest.get(key)
+        position = row.get("position")
+        best = current["best_position"] if current else None
+        if position is not None and (best is None or position < best):
+            best = position
+        if current is None or row["checked_at"] >= current["checked_at"]:
+            previous = last_found(current["position"], current["previous_position"]) if current else None
+            current = {
+                **{field: row[field] for field in KEY_FIELDS},
+                "project_id": row["project_id"],
+                "position": position,
+                "previous_position": previous,
+                "change": previous - position if previous is not None and position is not None else None,
+                "url": row.get("url"),
+                "checked_at": row["checked_at"],
+            }
+            latest[key] = current
+        current["best_position"] = best
+    return latest
+
+
+def upsert_latest_ranks(db: Session, rows: list[dict]) -> int:
+    """Fold freshly written keyword_rankings rows, or checks that found no
+    position (see app.tasks.writer.missing_writer), into keyword_latest_rank.
+
+    Only a check newer than the stored one moves the current position (and
+    shifts the old one into `previous_position`); older rows, e.g. from a
+    reparse backfill, can still lower `best_position`.
+    """
+    latest = latest_by_key(rows)
+    if not latest:
+        return 0
+
+    stmt = insert(KeywordLatestRank).values(list(latest.values()))
+    table, new = KeywordLatestRank.__table__.c, stmt.excluded
+    newer = new.checked_at > table.checked_at
+    previous = func.coalesce(table.position, table.previous_position)  # SQL twin of last_found()
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=list(KEY_FIELDS),
+        set_={
+            "project_id": new.project_id,
+            "position": case((newer, new.position), else_=table.position),
+            "previous_position": case((newer, previous), else_=table.previous_position),
+            "change": case((newer, previous - new.position), else_=table.change),
+            "url": case((newer, new.url), else_=table.url),
+            "checked_at": func.greatest(table.checked_at, new.checked_at),
+            "best_position": func.least(table.best_position, new.best_position),
+        },
+    ))
+    return len(latest)
+
+
+def rebuild_latest_ranks(db: Session, keyword_ids: list[int] | None = None):
+    """Recompute keyword_latest_rank from the full ranking history (initial fill or
+    repair), or only the rows of `keyword_ids` after some of their rankings changed.
+
+    Checks that found no position leave no history, so a row for one that
+    is newer than the history is kept and takes the last position found as
+    its `previous_position`.
+    """
+    where = "AND keyword_id = ANY(:ids)" if keyword_ids is not None else ""
+    params = {"ids": list(keyword_ids or [])}
+    db.execute(text(f"DELETE FROM keyword_latest_rank WHERE position IS NOT NULL {where}"), params)
+    db.execute(text(f"""
+        INSERT INTO keyword_latest_rank AS latest
+            (keyword_id, search_engine, region, device, project_id,
+             position, previous_position, best_position, change, url, checked_at)
+        SELECT keyword_id, search_engine, region, device, project_id,
+               position, previous_position, best_position, previous_position - position, url, checked_at
+        FROM (
+            SELECT keyword_id, search_engine, region, device, project_id, position, url, checked_at,
+                   lead(position) OVER w AS previous_position,
+                   min(position) OVER (PARTITION BY keyword_id, search_engine, region, device) AS best_position,
+                   row_number() OVER w AS n
+            FROM keyword_rankings
+            WHERE position IS NOT NULL {where}
+            WINDOW w AS (PARTITION BY keyword_id, search_engine, region, device ORDER BY checked_at DESC, id DESC)
+        ) ranked
+        WHERE n = 1
+        ON CONFLICT (keyword_id, search_engine, region, device) DO UPDATE SET
+            project_id = EXCLUDED.project_id,
+            position = CASE WHEN latest.checked_at > EXCLUDED.checked_at THEN NULL ELSE EXCLUDED.position END,
+            previous_position = CASE WHEN latest.checked_at > EXCLUDED.checked_at
+                                     THEN EXCLUDED.position ELSE EXCLUDED.previous_position END,
+            change = CASE WHEN latest.checked_at > EXCLUDED.checked_at THEN NULL ELSE EXCLUDED.change END,
+            url = CASE WHEN latest.checked_at > EXCLUDED.checked_at THEN NULL ELSE EXCLUDED.url END,
+            best_position = EXCLUDED.best_position,
+            checked_at = greatest(latest.checked_at, EXCLUDED.checked_at)
+    """), params)
+
+
+if __name__ == "__main__":
+    from app.database import session_scope
+
+    with session_scope() as db:
+        rebuild_latest_ranks(db)
+    print("[✓] Rebuilt keyword_latest_rank")
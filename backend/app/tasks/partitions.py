@@ -0,0 +1,62 @@
+# tasks/partitions.py
+import os
+from datetime import date
+
+from sqlalchemy import text
+
+from app.celery_worker import celery_app
+from app.database import engine
+
+PARTITIONED_TABLE = "keyword_rankings"
+# Monthly partitions kept ready ahead of the current month. Rows outside every
+# partition land in the default one, which must stay empty for a month's
+# partition to be created later, so keep this comfortably above zero.
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_{month:%Y_%m}"
+
+
+def ensure_partitions(conn, months_ahead: int = MONTHS_AHEAD, start: date | None = None) -> list[str]:
+    """Create the default partition and monthly partitions from `start` (this month)
+    through `months_ahead` months later; existing ones are left alone.
+
+    Does nothing if the table is not partitioned yet (before the migration).
+    """
+    partitioned = conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": PARTITIONED_TABLE},
+    ).scalar()
+    if not partitioned:
+        return []
+
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {PARTITIONED_TABLE}_default PARTITION OF {PARTITIONED_TABLE} DEFAULT"))
+    month = start or date.today().replace(day=1)
+    created = []
+    for i in range(months_ahead + 1):
+        lower, upper = add_months(month, i), add_months(month, i + 1)
+        name = partition_name(lower)
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            continue
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+@celery_app.task
+def create_ranking_partitions():
+    """Periodic (Celery beat) entry point: keep future keyword_rankings partitions in place."""
+    with engine.begin() as conn:
+        created = ensure_partitions(conn)
+    if created:
+        print(f"[✓] Created partitions: {', '.join(created)}")
+    return created
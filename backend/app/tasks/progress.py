@@ -0,0 +1,62 @@
+# tasks/progress.py
+import os
+
+from app.database import redis_client
+
+PROGRESS_TTL = int(os.getenv("RUN_PROGRESS_TTL", str(7 * 86400)))
+
+# Per-job outcomes reported by scrape tasks and the counters they bump.
+OUTCOME_FIELDS = {
+    "found": ("done", "found"),
+    "missing": ("done",),
+    "skipped": ("done",),  # already checked today
+    "failed": ("failed",),
+}
+
+
+def _key(run_id: int) -> str:
+    return f"run:{run_id}:progress"
+
+
+class RunProgress:
+    """Live counters of a ScrapeRun in a Redis hash, bumped atomically by workers.
+
+    `queued` counts keyword/engine jobs as they are queued; `dispatched` is
+    set once the run has queued all of them, so a run is finished when it is
+    dispatched and every queued job is done or failed.
+    """
+
+    def __init__(self, client=redis_client, ttl: int = PROGRESS_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    def add_queued(self, run_id: int, count: int):
+        with self.client.pipeline() as pipe:
+            pipe.hincrby(_key(run_id), "queued", count)
+            pipe.expire(_key(run_id), self.ttl)
+            pipe.execute()
+
+    def mark_dispatched(self, run_id: int):
+        with self.client.pipeline() as pipe:
+            pipe.hset(_key(run_id), "dispatched", 1)
+            pipe.expire(_key(run_id), self.ttl)
+            pipe.execute()
+
+    def record(self, run_id: int | None, outcomes: list[str]):
+        if not run_id or not outcomes:
+            return
+        with self.client.pipeline() as pipe:
+            for outcome in outcomes:
+                for field in OUTCOME_FIELDS[outcome]:
+                    pipe.hincrby(_key(run_id), field, 1)
+            pipe.expire(_key(run_id), self.ttl)
+            pipe.execute()
+
+    def get(self, run_id: int) -> dict:
+        raw = self.client.hgetall(_key(run_id))
+        counts = {field: int(raw.get(field, 0)) for field in ("queued", "done", "failed", "found")}
+        counts["finished"] = bool(raw.get("dispatched")) and counts["done"] + counts["failed"] >= counts["queued"]
+        return counts
+
+
+run_progress = RunProgress()
@@ -0,0 +1,159 @@
+# tasks/reparse.py
+"""Replay archived SERP pages through the current parsers and backfill rankings.
+
+Usage:
+    python -m app.tasks.reparse --engine google --since 2025-08-01 [--until 2025-08-15] [--workers 4] [--replace]
+
+Runs outside Celery on purpose: parsing is spread over a process pool, which
+Celery's daemonic prefork children are not allowed to start.
+"""
+import argparse
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from app.database import session_scope
+from app.models import DeviceType, Keyword, KeywordLatestRank, KeywordRanking, Project, SearchEngine, SerpPage
+from app.scrapers import archive
+from app.scrapers.matching import DomainMatcher
+from app.tasks.scheduler import SCHEDULER_DEVICE
+from app.tasks.scraper import NORMALIZED_KEYWORD, SCRAPERS
+from app.tasks.writer import ranking_writer, rebuild_ranking_aggregates
+
+
+def parse_archived_page(job: tuple[str, str, int]) -> list[dict]:
+    engine, content_hash, position_base = job
+    scraper = SCRAPERS[engine]("")
+    return scraper._renumber(scraper.parse(archive.load(content_hash)), position_base)
+
+
+def tracked_keywords(db, query: str, search_engine: SearchEngine, region: str, device: DeviceType) -> list[tuple]:
+    """(keyword_id, project_id, url) of active keywords whose SERP for `query` is this one.
+
+    Projects do not store a device: a keyword counts as tracked on `device` when
+    it is the scheduler's device or the keyword already has a check recorded on it.
+    """
+    criteria = [
+        NORMALIZED_KEYWORD == query,
+        Project.search_engine == search_engine,
+        Project.target_region == region,
+        Keyword.is_paused.is_(False),
+        Project.is_paused.is_(False),
+    ]
+    if device != DeviceType(SCHEDULER_DEVICE):
+        criteria.append(
+            db.query(KeywordLatestRank.keyword_id)
+            .filter(
+                KeywordLatestRank.keyword_id == Keyword.id,
+                KeywordLatestRank.search_engine == search_engine,
+                KeywordLatestRank.region == region,
+                KeywordLatestRank.device == device,
+            )
+            .exists()
+        )
+    return (
+        db.query(Keyword.id, Keyword.project_id, Project.url)
+        .join(Project, Keyword.project_id == Project.id)
+        .filter(*criteria)
+        .all()
+    )
+
+
+def reparse_day(pool: ProcessPoolExecutor, engine: str, day: datetime, replace: bool) -> int:
+    search_engine = SearchEngine[engine.upper()]
+    with session_scope() as db:
+        pages = (
+            db.query(SerpPage.query, SerpPage.region, SerpPage.device, SerpPage.fetched_at,
+                     SerpPage.content_hash, SerpPage.position_base)
+            .filter(
+                SerpPage.search_engine == search_engine,
+                SerpPage.fetched_at >= day,
+                SerpPage.fetched_at < day + timedelta(days=1),
+            )
+            .order_by(SerpPage.fetched_at, SerpPage.page)
+            .all()
+        )
+    if not pages:
+        return 0
+
+    jobs = [(engine, page.content_hash, page.position_base) for page in pages]
+    fetches = defaultdict(list)
+    for page, results in zip(pages, pool.map(parse_archived_page, jobs, chunksize=16)):
+        fetches[(page.query, page.region, page.device, page.fetched_at)].extend(results)
+
+    written = 0
+    backfilled = set()
+    cleared = set()
+    replaced = set()
+    with session_scope() as db:
+        for (query, region, device, fetched_at), results in fetches.items():
+            targets = tracked_keywords(db, query, search_engine, region, DeviceType(device))
+            matcher = DomainMatcher((url, keyword_id) for keyword_id, _, url in targets)
+            matches = matcher.first_matches(results)
+
+            for keyword_id, project_id, _ in targets:
+                check = (keyword_id, region, device)
+                existing = db.query(KeywordRanking).filter(
+                    KeywordRanking.keyword_id == keyword_id,
+                    KeywordRanking.search_engine == search_engine,
+                    KeywordRanking.region == region,
+                    KeywordRanking.device == device,
+                    KeywordRanking.checked_at >= day,
+                    KeywordRanking.checked_at < day + timedelta(days=1),
+                )
+                if replace and check not in cleared:
+                    # Clear the day even if the current parsers no longer find the project.
+                    if existing.delete(synchronize_session=False):
+                        replaced.add(keyword_id)
+                    cleared.add(check)
+
+                result = matches.get(keyword_id)
+                if not result or check in backfilled:
+                    continue
+                if not replace and db.query(existing.exists()).scalar():
+                    continue
+
+                ranking_writer.add(
+                    keyword_id=keyword_id,
+                    project_id=project_id,
+                    search_engine=search_engine,
+                    region=region,
+                    device=DeviceType(device),
+                    position=result["position"],
+                    url=result["url"],
+                    title=result["title"],
+                    snippet=result["snippet"],
+                    checked_at=fetched_at,
+                )
+                backfilled.add(check)
+                written += 1
+
+    ranking_writer.flush()
+    if replace and (replaced or backfilled):
+        # The flush added the new rows on top of the replaced ones; recount those days.
+        with session_scope() as db:
+            rebuild_ranking_aggregates(db, sorted(replaced | {keyword_id for keyword_id, _, _ in backfilled}),
+                                       day, day + timedelta(days=1) - timedelta(microseconds=1))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", required=True, choices=sorted(SCRAPERS))
+    parser.add_argument("--since", required=True, type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat, default=datetime.utcnow())
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--replace", action="store_true", help="overwrite rankings already recorded for the same day")
+    args = parser.parse_args()
+
+    day = args.since.replace(hour=0, minute=0, second=0, microsecond=0)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while day < args.until:
+            written = reparse_day(pool, args.engine, day, args.replace)
+            print(f"[✓] {day.date()}: backfilled {written} rankings")
+            day += timedelta(days=1)
+
+
+if __name__ == "__main__":
+    main()
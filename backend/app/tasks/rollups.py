@@ -0,0 +1,211 @@
+# tasks/rollups.py
+"""Daily/weekly rank rollups and downsampling of old keyword_rankings rows.
+
+Rollups are updated from every ranking flush, so raw rows can be thinned
+without losing the min/max/average of the periods they covered. Installs
+with history from before rollups existed should run, once, before the
+downsampling task first fires:
+
+    python -m app.tasks.rollups --rebuild [--sweep-days 3650]
+"""
+import argparse
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.celery_worker import celery_app
+from app.database import session_scope
+from app.models import KeywordRankRollup
+
+KEY_FIELDS = ("keyword_id", "search_engine", "region", "device")
+PERIODS = ("day", "week")
+
+# Raw checks are kept in full for RAW_RETENTION_DAYS, then thinned to the last
+# check per day; after DAILY_RETENTION_DAYS to the last check per week, and the
+# daily rollups are dropped. Weekly rollups are kept forever.
+RAW_RETENTION_DAYS = int(os.getenv("RANKING_RAW_RETENTION_DAYS", "90"))
+DAILY_RETENTION_DAYS = int(os.getenv("RANKING_DAILY_RETENTION_DAYS", "730"))
+# Days behind each cutoff swept per run; whole periods only, so reruns are no-ops.
+SWEEP_DAYS = int(os.getenv("RANKING_DOWNSAMPLE_SWEEP_DAYS", "14"))
+
+
+def period_start(period: str, moment: datetime) -> date:
+    day = moment.date()
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+def upsert_rank_rollups(db: Session, rows: list[dict]) -> int:
+    """Fold freshly written keyword_rankings rows into the day and week rollups."""
+    rollups = {}
+    for row in rows:
+        position = row.get("position")
+        if position is None:
+            continue
+        for period in PERIODS:
+            key = (*(row[field] for field in KEY_FIELDS), period, period_start(period, row["checked_at"]))
+            current = rollups.get(key)
+            if current is None:
+                rollups[key] = {
+                    **{field: row[field] for field in KEY_FIELDS},
+                    "period": period,
+                    "period_start": key[-1],
+                    "project_id": row["project_id"],
+                    "min_position": position,
+                    "max_position": position,
+                    "position_sum": position,
+                    "checks": 1,
+                    "last_position": position,
+                    "last_checked_at": row["checked_at"],
+                }
+                continue
+            current["min_position"] = min(current["min_position"], position)
+            current["max_position"] = max(current["max_position"], position)
+            current["position_sum"] += position
+            current["checks"] += 1
+            if row["checked_at"] >= current["last_checked_at"]:
+                current["last_position"] = position
+                current["last_checked_at"] = row["checked_at"]
+    if not rollups:
+        return 0
+
+    stmt = insert(KeywordRankRollup).values(list(rollups.values()))
+    table, new = KeywordRankRollup.__table__.c, stmt.excluded
+    newer = new.last_checked_at >= table.last_checked_at
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[*KEY_FIELDS, "period", "period_start"],
+        set_={
+            "min_position": func.least(table.min_position, new.min_position),
+            "max_position": func.greatest(table.max_position, new.max_position),
+            "position_sum": table.position_sum + new.position_sum,
+            "checks": table.checks + new.checks,
+            "last_position": case((newer, new.last_position), else_=table.last_position),
+            "last_checked_at": func.greatest(table.last_checked_at, new.last_checked_at),
+        },
+    ))
+    return len(rollups)
+
+
+ROLLUPS_FROM_RANKINGS = """
+    INSERT INTO keyword_rank_rollups
+        (keyword_id, search_engine, region, device, period, period_start, project_id,
+         min_position, max_position, position_sum, checks, last_position, last_checked_at)
+    SELECT keyword_id, search_engine, region, device, :period, date_trunc(:period, checked_at)::date,
+           min(project_id), min(position), max(position), sum(position), count(*),
+           (array_agg(position ORDER BY checked_at DESC, id DESC))[1], max(checked_at)
+    FROM keyword_rankings
+    WHERE position IS NOT NULL {where}
+    GROUP BY keyword_id, search_engine, region, device, date_trunc(:period, checked_at)
+"""
+
+# Weeks re-added up from their day rollups, which outlive the raw rows they summarize.
+WEEKS_FROM_DAYS = """
+    INSERT INTO keyword_rank_rollups
+        (keyword_id, search_engine, region, device, period, period_start, project_id,
+         min_position, max_position, position_sum, checks, last_position, last_checked_at)
+    SELECT keyword_id, search_engine, region, device, 'week', date_trunc('week', period_start)::date,
+           min(project_id), min(min_position), max(max_position), sum(position_sum), sum(checks),
+           (array_agg(last_position ORDER BY last_checked_at DESC))[1], max(last_checked_at)
+    FROM keyword_rank_rollups
+    WHERE period = 'day' AND keyword_id = ANY(:ids) AND period_start >= :lower AND period_start < :upper
+    GROUP BY keyword_id, search_engine, region, device, date_trunc('week', period_start)
+"""
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup from keyword_rankings; only exact before any downsampling."""
+    db.execute(text("TRUNCATE keyword_rank_rollups"))
+    for period in PERIODS:
+        db.execute(text(ROLLUPS_FROM_RANKINGS.format(where="")), {"period": period})
+
+
+def rebuild_rollup_periods(db: Session, keyword_ids: list[int], start: datetime, end: datetime):
+    """Recompute the rollups of `keyword_ids` for the periods covering `start`..`end`,
+    after rankings in that range were deleted or replaced.
+
+    Days are recomputed from keyword_rankings, weeks from their day rollups
+    (or, past DAILY_RETENTION_DAYS, from the weekly rows left after downsampling).
+    """
+    daily_cutoff = (datetime.utcnow() - timedelta(days=DAILY_RETENTION_DAYS)).date()
+    for period, length in (("day", 1), ("week", 7)):
+        lower = period_start(period, start)
+        upper = period_start(period, end) + timedelta(days=length)
+        params = {"period": period, "ids": list(keyword_ids), "lower": lower, "upper": upper}
+        db.query(KeywordRankRollup).filter(
+            KeywordRankRollup.keyword_id.in_(keyword_ids),
+            KeywordRankRollup.period == period,
+            KeywordRankRollup.period_start >= lower,
+            KeywordRankRollup.period_start < upper,
+        ).delete(synchronize_session=False)
+        if period == "week" and lower >= daily_cutoff:
+            db.execute(text(WEEKS_FROM_DAYS), params)
+        else:
+            where = "AND keyword_id = ANY(:ids) AND checked_at >= :lower AND checked_at < :upper"
+            db.execute(text(ROLLUPS_FROM_RANKINGS.format(where=where)), params)
+
+
+def thin_rankings(db: Session, period: str, cutoff: datetime, sweep_days: int = SWEEP_DAYS) -> int:
+    """Keep only the last check per key and `period` for whole periods in the
+    `sweep_days` before `cutoff`."""
+    lower = period_start(period, cutoff - timedelta(days=sweep_days))
+    upper = period_start(period, cutoff)
+    if lower >= upper:
+        return 0
+    return db.execute(text("""
+        DELETE FROM keyword_rankings r
+        USING (
+            SELECT id, checked_at,
+                   row_number() OVER (
+                       PARTITION BY keyword_id, search_engine, region, device, date_trunc(:period, checked_at)
+                       ORDER BY checked_at DESC, id DESC
+                   ) AS n
+            FROM keyword_rankings
+            WHERE checked_at >= :lower AND checked_at < :upper
+        ) ranked
+        WHERE r.id = ranked.id AND r.checked_at = ranked.checked_at AND ranked.n > 1
+    """), {"period": period, "lower": lower, "upper": upper}).rowcount
+
+
+def downsample_rankings(db: Session, now: datetime | None = None, sweep_days: int = SWEEP_DAYS) -> dict:
+    now = now or datetime.utcnow()
+    daily_cutoff = now - timedelta(days=DAILY_RETENTION_DAYS)
+    removed = {
+        "day": thin_rankings(db, "day", now - timedelta(days=RAW_RETENTION_DAYS), sweep_days),
+        "week": thin_rankings(db, "week", daily_cutoff, sweep_days),
+    }
+    removed["rollups"] = db.query(KeywordRankRollup).filter(
+        KeywordRankRollup.period == "day",
+        KeywordRankRollup.period_start < daily_cutoff.date(),
+    ).delete(synchronize_session=False)
+    return removed
+
+
+@celery_app.task
+def downsample_ranking_history():
+    """Periodic (Celery beat) entry point: apply the rank history retention policy."""
+    with session_scope() as db:
+        removed = downsample_rankings(db)
+    print(f"[✓] Downsampled rankings: {removed['day']} raw rows to daily, {removed['week']} to weekly, "
+          f"{removed['rollups']} daily rollups dropped")
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rebuild", action="store_true", help="recompute all rollups from keyword_rankings first")
+    parser.add_argument("--sweep-days", type=int, default=SWEEP_DAYS, help="how far behind each cutoff to downsample")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        with session_scope() as db:
+            rebuild_rollups(db)
+        print("[✓] Rebuilt keyword_rank_rollups")
+    with session_scope() as db:
+        removed = downsample_rankings(db, sweep_days=args.sweep_days)
+    print(f"[✓] Downsampled rankings: {removed}")
+
+
+if __name__ == "__main__":
+    main()
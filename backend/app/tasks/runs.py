@@ -0,0 +1,92 @@
+# tasks/runs.py
+import hashlib
+import os
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import redis_client
+from app.models import ScrapeRun
+
+# A keyword is checked at most once per (engine, region, device) and UTC day;
+# the lock outlives the day a little so late retries still see it.
+LOCK_TTL = int(os.getenv("SCRAPE_LOCK_TTL", str(36 * 3600)))
+# Until its ranking is written a lock only covers the scrape in flight, so a
+# worker that dies mid-check does not block the keyword for the rest of the day.
+IN_FLIGHT_TTL = int(os.getenv("SCRAPE_LOCK_IN_FLIGHT_TTL", "3600"))
+
+
+def idempotency_key(project_id: int, search_engines: list[str], region: str, device: str, day=None) -> str:
+    """Key shared by every trigger of the same project check on the same UTC day."""
+    day = day or datetime.utcnow().date()
+    engines = ",".join(sorted(engine.lower() for engine in search_engines))
+    raw = f"{project_id}|{engines}|{region.lower()}|{device.lower()}|{day.isoformat()}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def create_run(db: Session, project_id: int, search_engines: list[str], region: str, device: str,
+               key: str | None = None, user_id: int | None = None) -> tuple[ScrapeRun, bool]:
+    """Return the run for `key`, creating it if needed; the flag tells whether it is new."""
+    key = key or idempotency_key(project_id, search_engines, region, device)
+    run_id = db.execute(
+        insert(ScrapeRun)
+        .values(
+            project_id=project_id,
+            idempotency_key=key,
+            search_engines=[engine.lower() for engine in search_engines],
+            region=region,
+            device=device.lower(),
+            created_by=user_id,
+        )
+        .on_conflict_do_nothing(index_elements=[ScrapeRun.idempotency_key])
+        .returning(ScrapeRun.id)
+    ).scalar()
+    db.commit()
+    if run_id:
+        return db.get(ScrapeRun, run_id), True
+    return db.query(ScrapeRun).filter(ScrapeRun.idempotency_key == key).one(), False
+
+
+def _lock_key(keyword_id: int, engine: str, region: str, device: str, day) -> str:
+    return f"scrape:lock:{engine.lower()}:{region.lower()}:{device.lower()}:{day.isoformat()}:{keyword_id}"
+
+
+class ScrapeLocks:
+    """Redis locks per (keyword, engine, region, device, day).
+
+    A lock is claimed for `in_flight_ttl` while a keyword is being scraped
+    and extended to `ttl` once its result is stored (`confirm`), so repeated
+    triggers and overlapping schedules skip keywords already checked or in
+    flight today. It is released when the scrape fails.
+    """
+
+    def __init__(self, client=redis_client, ttl: int = LOCK_TTL, in_flight_ttl: int = IN_FLIGHT_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.in_flight_ttl = in_flight_ttl
+
+    def claim(self, keyword_ids: list[int], engine: str, region: str, device: str, day) -> set[int]:
+        """Lock what is free and return the keyword ids now owned by the caller."""
+        with self.client.pipeline(transaction=False) as pipe:
+            for keyword_id in keyword_ids:
+                pipe.set(_lock_key(keyword_id, engine, region, device, day), 1, nx=True, ex=self.in_flight_ttl)
+            claimed = pipe.execute()
+        return {keyword_id for keyword_id, ok in zip(keyword_ids, claimed) if ok}
+
+    def confirm(self, checks: list[tuple]):
+        """Keep the locks of finished (keyword_id, engine, region, device, day) checks for the full TTL."""
+        if not checks:
+            return
+        with self.client.pipeline(transaction=False) as pipe:
+            for check in checks:
+                pipe.set(_lock_key(*check), 1, ex=self.ttl)
+            pipe.execute()
+
+    def release(self, keyword_ids: list[int], engine: str, region: str, device: str, day):
+        if not keyword_ids:
+            return
+        self.client.delete(*(_lock_key(keyword_id, engine, region, device, day) for keyword_id in keyword_ids))
+
+
+scrape_locks = ScrapeLocks()
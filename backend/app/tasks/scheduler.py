@@ -0,0 +1,103 @@
+# tasks/scheduler.py
+import math
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, update
+
+from app.celery_worker import celery_app
+from app.database import session_scope
+from app.models import Keyword, Project, SearchEngine
+from app.scrapers.breaker import circuit_breaker
+from app.tasks.adaptive import DEFAULT_FREQUENCY, FREQUENCY_HOURS, base_hours_sql
+from app.tasks.runs import IN_FLIGHT_TTL
+from app.tasks.scraper import SCRAPERS, dispatch_groups, group_keywords
+
+CHECK_INTERVALS = {name: timedelta(hours=base) for name, (base, _) in FREQUENCY_HOURS.items()}
+
+TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "900"))
+# Dispatch a little more than the steady-state rate so backlogs drain.
+CATCH_UP_FACTOR = float(os.getenv("SCHEDULER_CATCH_UP_FACTOR", "1.25"))
+SCHEDULER_DEVICE = os.getenv("SCHEDULER_DEVICE", "desktop")
+# How long a dispatched keyword stays claimed. Its check result reschedules it
+# (app.tasks.adaptive.record_checks); if none is written it is due again after this.
+LEASE = timedelta(seconds=int(os.getenv("SCHEDULER_LEASE_SECONDS", str(IN_FLIGHT_TTL))))
+
+
+def due_criteria(now: datetime) -> list:
+    """Filters for active keywords that are due for a check.
+
+    Keywords with an adaptive schedule are due at `next_check_at`; the rest
+    when their last check is older than their project's frequency. Plain
+    ranges on the indexed `next_check_at`/`last_checked` columns keep both
+    branches index-driven, unlike comparing against a per-row interval.
+    """
+    frequency = func.coalesce(Project.rank_check_frequency, DEFAULT_FREQUENCY)
+    overdue = [
+        and_(frequency == name, Keyword.last_checked < now - interval)
+        for name, interval in CHECK_INTERVALS.items()
+    ]
+    return [
+        Keyword.is_paused.is_(False),
+        Project.is_paused.is_(False),
+        or_(
+            Keyword.next_check_at <= now,
+            and_(Keyword.next_check_at.is_(None), or_(Keyword.last_checked.is_(None), *overdue)),
+        ),
+    ]
+
+
+def tick_budget(db, now: datetime) -> int:
+    """Checks to dispatch this tick so the daily load is spread evenly across ticks."""
+    per_day = (
+        db.query(func.coalesce(func.sum(24.0 / func.coalesce(Keyword.check_interval_hours, base_hours_sql())), 0))
+        .join(Project, Keyword.project_id == Project.id)
+        .filter(Keyword.is_paused.is_(False), Project.is_paused.is_(False))
+        .scalar()
+    )
+    return math.ceil(float(per_day) * TICK_SECONDS / 86400 * CATCH_UP_FACTOR)
+
+
+def claim(db, keyword_ids: list[int], now: datetime):
+    """Lease keywords for one check: they are not due again until the lease runs out."""
+    db.execute(update(Keyword).where(Keyword.id.in_(keyword_ids)).values(next_check_at=now + LEASE))
+
+
+@celery_app.task
+def schedule_due_keywords():
+    """Periodic (Celery beat) entry point: dispatch this tick's share of due keywords.
+
+    Keywords are claimed with a short lease in `next_check_at` and their
+    scrapes are jittered across the tick, so the scraper queue sees a steady
+    trickle instead of a spike when many keywords fall due together. Keywords of
+    engines whose circuit breaker is open stay due until it closes.
+    """
+    now = datetime.utcnow()
+    criteria = due_criteria(now)
+    open_engines = circuit_breaker.open_engines(SCRAPERS)
+    if open_engines:
+        print(f"[!] Not scheduling {', '.join(open_engines)}: circuit open")
+        criteria.append(Project.search_engine.notin_([SearchEngine[engine.upper()] for engine in open_engines]))
+
+    with session_scope() as db:
+        budget = tick_budget(db, now)
+        keyword_ids = [
+            keyword_id for (keyword_id,) in (
+                db.query(Keyword.id)
+                .join(Project, Keyword.project_id == Project.id)
+                .filter(*criteria)
+                .order_by(Keyword.last_checked.asc().nullsfirst())
+                .limit(budget)
+                .with_for_update(of=Keyword, skip_locked=True)
+            )
+        ]
+        if not keyword_ids:
+            return 0
+
+        claim(db, keyword_ids, now)
+        groups = group_keywords(db, Keyword.id.in_(keyword_ids))
+
+    dispatch_groups(groups, SCHEDULER_DEVICE, countdown=lambda: random.uniform(0, TICK_SECONDS))
+    print(f"[✓] Scheduled {len(keyword_ids)} due keywords in {len(groups)} SERP groups")
+    return len(keyword_ids)
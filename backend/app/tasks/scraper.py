@@ -1,87 +1,475 @@
 # tasks/scraper.py
 # from celery import shared_task
+import asyncio
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, NamedTuple
+from celery.signals import worker_process_shutdown, worker_shutdown
+from celery.utils.time import get_exponential_backoff_interval
 from app.celery_worker import celery_app
-from app.database import get_db
-from app.models import Project, Keyword, KeywordRanking, SearchEngine, DeviceType
+from app.database import session_scope
+from app.models import Project, Keyword, ScrapeRun, SearchEngine, DeviceType
 from app.scrapers.google import GoogleScraper
 from app.scrapers.bing import BingScraper
 from app.scrapers.yahoo import YahooScraper
+from app.scrapers import archive
+from app.scrapers.breaker import circuit_breaker
+from app.scrapers.cache import normalize_keyword
+from app.scrapers.client import run_sync, shutdown as shutdown_client
+from app.scrapers.errors import CircuitOpenError, ScrapeError, TransientScrapeError
+from app.scrapers.matching import DomainMatcher
+from app.snapshots import build_snapshot
+from app.tasks.fairshare import fair_queue
+from app.tasks.progress import run_progress
+from app.tasks.runs import scrape_locks
+from app.tasks.writer import missing_writer, page_writer, ranking_writer, snapshot_writer
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
+SCRAPERS = {
+    "google": GoogleScraper,
+    "bing": BingScraper,
+    "yahoo": YahooScraper,
+}
+
+# Keywords per `run_keyword_batch_scrape` message (1 = one message per keyword)
+# and how many of a batch's SERPs are fetched at once on the scraper loop.
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", "50"))
+BATCH_CONCURRENCY = int(os.getenv("SCRAPE_BATCH_CONCURRENCY", "10"))
+
+# SQL twin of app.scrapers.cache.normalize_keyword.
+NORMALIZED_KEYWORD = func.lower(func.regexp_replace(func.trim(Keyword.keyword), r"\s+", " ", "g"))
+
+
+class Target(NamedTuple):
+    """What a scrape needs to know about a tracked keyword, detached from the session."""
+    keyword_id: int
+    project_id: int
+    url: str
+    keyword: str
+
+
+def load_targets(db: Session, keyword_ids: list[int]) -> list[Target]:
+    rows = (
+        db.query(Keyword.id, Keyword.project_id, Project.url, Keyword.keyword)
+        .join(Project, Keyword.project_id == Project.id)
+        .filter(Keyword.id.in_(keyword_ids))
+    )
+    return [Target(*row) for row in rows]
+
 
 # @shared_task
-@celery_app.task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
-def run_rank_tracking_task(project_id: int, search_engines: list[str], region: str, device: str):
-    db: Session = next(get_db())
-    project = db.query(Project).filter(Project.id == project_id).first()
+# Dispatchers only retry when the database is unreachable; scrape tasks retry
+# transient proxy/network failures (see app.scrapers.errors).
+@celery_app.task(bind=True, autoretry_for=(OperationalError,), retry_backoff=True, max_retries=3)
+def run_rank_tracking_task(self, project_id: int, search_engines: list[str], region: str, device: str,
+                           batch_size: int = SCRAPE_BATCH_SIZE, run_id: int | None = None):
+    """Queue the project's keywords for every engine behind the fair-share dispatcher.
 
-    if not project:
-        print(f"[!] Project {project_id} not found.")
-        return
+    Keyword ids are streamed from a server-side cursor and queued in chunks
+    of `batch_size` per `run_keyword_batch_scrape` job; `batch_size=1` queues
+    one `run_keyword_scrape` per keyword instead. A `ScrapeRun` already
+    queued is not queued again, so redelivered or retried calls are no-ops.
+    """
+    with session_scope() as db:
+        run = db.get(ScrapeRun, run_id) if run_id else None
+        if run and run.status != "pending":
+            print(f"[*] Scrape run {run_id} already {run.status}, nothing to do.")
+            return
 
-    print(f"[*] Starting rank tracking for Project {project_id}: '{project.name}'")
+        project = db.query(Project).filter(Project.id == project_id).first()
 
-    for keyword in project.keywords:
-        for engine in search_engines:
-            run_keyword_scrape.delay(
-                keyword_id=keyword.id,
-                project_id=project.id,
-                engine=engine,
-                region=region,
-                device=device
+        if not project:
+            print(f"[!] Project {project_id} not found.")
+            return
+
+        print(f"[*] Starting rank tracking for Project {project_id}: '{project.name}'")
+
+        owner_id, plan, language = project.owner_id, project.owner.subscription_plan, project.language
+        keyword_ids = (
+            keyword_id for (keyword_id,) in (
+                db.query(Keyword.id)
+                .filter(Keyword.project_id == project.id)
+                .order_by(Keyword.id)
+                .execution_options(yield_per=max(batch_size, 1000))
             )
+        )
+        queued = 0
+        for chunk in chunked(keyword_ids, max(batch_size, 1)):
+            if batch_size > 1:
+                task_name = run_keyword_batch_scrape.name
+                jobs = [
+                    dict(keyword_ids=chunk, project_id=project.id, engine=engine, region=region, device=device,
+                         language=language, run_id=run_id)
+                    for engine in search_engines
+                ]
+            else:
+                task_name = run_keyword_scrape.name
+                jobs = [
+                    dict(keyword_id=chunk[0], project_id=project.id, engine=engine, region=region, device=device, run_id=run_id)
+                    for engine in search_engines
+                ]
+            fair_queue.enqueue(owner_id, plan, project.id, task_name, jobs)
+            queued += len(jobs)
+            if run:
+                run_progress.add_queued(run.id, len(chunk) * len(search_engines))
 
-    print("[✓] All subtasks dispatched.")
+        if run:
+            run.status = "queued"
+            run.jobs = queued
+            run_progress.mark_dispatched(run.id)
 
-@celery_app.task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+    print(f"[✓] Queued {queued} subtasks for fair-share dispatch.")
+
+def chunked(items: Iterable, size: int) -> Iterable[list]:
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+@celery_app.task(bind=True, autoretry_for=(OperationalError,), retry_backoff=True, max_retries=3)
+def run_grouped_rank_tracking(self, project_ids: list[int] | None = None, device: str = "desktop"):
+    """Fetch each distinct SERP once across projects instead of once per project keyword.
+
+    Active keywords are grouped by normalized query and by their project's
+    engine, region and language; every group becomes one `run_serp_group_scrape`.
+    """
+    criteria = [Keyword.is_paused.is_(False), Project.is_paused.is_(False)]
+    if project_ids:
+        criteria.append(Project.id.in_(project_ids))
+
+    with session_scope() as db:
+        groups = group_keywords(db, *criteria)
+
+    dispatch_groups(groups, device)
+    print(f"[✓] Dispatched {len(groups)} SERP groups.")
+
+def group_keywords(db: Session, *criteria) -> list[tuple]:
+    """(query, engine, region, language, keyword_ids) for keywords matching `criteria`."""
+    return (
+        db.query(NORMALIZED_KEYWORD, Project.search_engine, Project.target_region, Project.language, func.array_agg(Keyword.id))
+        .join(Project, Keyword.project_id == Project.id)
+        .filter(*criteria)
+        .group_by(NORMALIZED_KEYWORD, Project.search_engine, Project.target_region, Project.language)
+        .all()
+    )
+
+def dispatch_groups(groups: list[tuple], device: str, countdown=lambda: None):
+    for query, engine, region, language, keyword_ids in groups:
+        run_serp_group_scrape.apply_async(
+            kwargs=dict(
+                keyword_ids=keyword_ids,
+                engine=engine.name.lower(),
+                region=region,
+                device=device,
+                language=language,
+            ),
+            countdown=countdown(),
+        )
+
+@celery_app.task(bind=True, autoretry_for=(TransientScrapeError,), retry_backoff=True, max_retries=3)
 # @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
-def run_keyword_scrape(keyword_id: int, project_id: int, engine: str, region: str, device: str):
-    db: Session = next(get_db())
-    keyword = db.query(Keyword).filter(Keyword.id == keyword_id).first()
-    project = db.query(Project).filter(Project.id == project_id).first()
+def run_keyword_scrape(self, keyword_id: int, project_id: int, engine: str, region: str, device: str,
+                       run_id: int | None = None):
+    try:
+        with session_scope() as db:
+            targets = load_targets(db, [keyword_id])
+            language = db.query(Project.language).filter(Project.id == project_id).scalar()
 
-    if not keyword or not project:
-        print(f"[!] Skipping task: invalid keyword {keyword_id} or project {project_id}")
+        if not targets or targets[0].project_id != project_id:
+            print(f"[!] Skipping task: invalid keyword {keyword_id} or project {project_id}")
+            run_progress.record(run_id, ["skipped"])
+            return
+
+        outcomes = scrape_and_record(targets, engine, region, device, language)
+    except CircuitOpenError as e:
+        if self.request.retries >= self.max_retries:
+            run_progress.record(run_id, ["failed"])
+        raise self.retry(exc=e, countdown=e.retry_in)
+    except Exception as e:
+        count_as_failed(self, run_id, 1, e)
+        raise
+    run_progress.record(run_id, list(outcomes.values()))
+
+@celery_app.task(bind=True, autoretry_for=(TransientScrapeError,), retry_backoff=True, max_retries=3)
+def run_serp_group_scrape(self, keyword_ids: list[int], engine: str, region: str, device: str, language: str = "en"):
+    with session_scope() as db:
+        targets = load_targets(db, keyword_ids)
+
+    if not targets:
+        print(f"[!] Skipping task: no keywords left in group {keyword_ids}")
         return
-    
-    scraper_cls = {
-        "google": GoogleScraper,
-        "bing": BingScraper,
-        "yahoo": YahooScraper
-    }.get(engine)
-
-    if not scraper_cls:
-        print(f"[!] Unsupported search engine: {engine}")
+
+    try:
+        scrape_and_record(targets, engine, region, device, language)
+    except CircuitOpenError as e:
+        raise self.retry(exc=e, countdown=e.retry_in)
+
+
+@celery_app.task(bind=True, autoretry_for=(OperationalError,), retry_backoff=True, max_retries=3)
+def run_keyword_batch_scrape(self, keyword_ids: list[int], project_id: int, engine: str, region: str, device: str,
+                             language: str = "en", run_id: int | None = None):
+    """Scrape a chunk of one project's keywords concurrently; rankings are written in bulk by `ranking_writer`.
+
+    Only keywords that failed with a retryable error are retried.
+    """
+    try:
+        with session_scope() as db:
+            targets = [target for target in load_targets(db, keyword_ids) if target.project_id == project_id]
+    except Exception as e:
+        count_as_failed(self, run_id, len(keyword_ids), e)
+        raise
+
+    run_progress.record(run_id, ["skipped"] * (len(keyword_ids) - len(targets)))
+    if not targets:
+        print(f"[!] Skipping task: no keywords left in batch for project {project_id}")
         return
-    
+
     try:
-        scraper = scraper_cls(keyword.name, region=region, device=device)
-        html = scraper.scrape()
-        results = scraper.parse(html)
-
-        for result in results:
-            if project.url in result["url"]:
-                ranking = KeywordRanking(
-                    keyword_id=keyword.id,
-                    project_id=project.id,
-                    search_engine=SearchEngine(engine.upper()),
-                    region=region,
-                    device=DeviceType(device.upper()),
-                    position=result["position"],
-                    url=result["url"],
-                    title=result["title"],
-                    snippet=result["snippet"]
-                )
-                db.add(ranking)
-                db.commit()
-                print(f"[✓] Recorded position {result['position']} for '{keyword.name}' on {engine}")
-                break
+        outcomes, failed, retry_in = scrape_batch(targets, engine, region, device, language)
+    except Exception as e:
+        count_as_failed(self, run_id, len(targets), e)
+        raise
+    run_progress.record(run_id, list(outcomes.values()))
+    if failed and self.request.retries >= self.max_retries:
+        run_progress.record(run_id, ["failed"] * len(failed))
+    elif failed:
+        countdown = retry_in or get_exponential_backoff_interval(
+            factor=1, retries=self.request.retries, maximum=600, full_jitter=True
+        )
+        raise self.retry(kwargs={**self.request.kwargs, "keyword_ids": failed}, countdown=countdown)
+
+
+def count_as_failed(task, run_id: int | None, jobs: int, error: Exception):
+    """Record the jobs of a scrape task that is dying as failed, so its run can still
+    finish; skipped when Celery is about to retry the task."""
+    if isinstance(error, task.autoretry_for) and task.request.retries < task.max_retries:
+        return
+    run_progress.record(run_id, ["failed"] * jobs)
+
+
+class SerpJob:
+    """One SERP fetch for the keywords sharing a query.
+
+    Only `fetch()` runs on the scraper loop. Claiming, matching and recording
+    happen in the calling worker thread, so their blocking Redis, database
+    and archive work never stalls the other requests in flight on the loop.
+    """
+
+    def __init__(self, targets: list[Target], engine: str, region: str, device: str, language: str, day):
+        self.targets = targets
+        self.engine = engine
+        self.region = region
+        self.device = device
+        self.day = day
+        self.matcher = DomainMatcher((target.url, target.keyword_id) for target in targets)
+        self.scraper = SCRAPERS[engine](targets[0].keyword, region=region, device=device, language=language)
+
+    @property
+    def keyword_ids(self) -> list[int]:
+        return [target.keyword_id for target in self.targets]
+
+    def found_all(self, results: list[dict]) -> bool:
+        # Stop paging once every project tracking this query has shown up.
+        return len(self.matcher.first_matches(results)) == len(self.matcher)
+
+    async def fetch(self) -> list[dict]:
+        return await self.scraper.ascrape_cached(self.found_all)
+
+    def release(self):
+        scrape_locks.release(self.keyword_ids, self.engine, self.region, self.device, self.day)
+
+    def failed(self, error: ScrapeError):
+        self.release()
+        circuit_breaker.record_failure(self.engine)
+        print(f"[!] Error scraping {self.engine} for keyword '{self.scraper.keyword}': {type(error).__name__}: {error}")
+
+    def crashed(self, error: BaseException):
+        # Not a scrape failure (a bug, a Redis or database outage): free the keywords for a later check.
+        self.release()
+        print(f"[x] Unexpected error checking '{self.scraper.keyword}' on {self.engine}: {type(error).__name__}: {error}")
+
+
+def claim_jobs(groups: list[list[Target]], engine: str, region: str, device: str,
+               language: str) -> tuple[dict[int, str], list[SerpJob]]:
+    """Lock today's check of every keyword in `groups` and build a job per group with keywords left.
+
+    Keywords already checked or in flight today for this engine, region and
+    device come back as skipped (see app.tasks.runs.ScrapeLocks).
+    """
+    day = datetime.utcnow().date()
+    keyword_ids = [target.keyword_id for group in groups for target in group]
+    claimed = scrape_locks.claim(keyword_ids, engine, region, device, day)
+    if len(claimed) < len(keyword_ids):
+        print(f"[*] Skipping {len(keyword_ids) - len(claimed)} keyword(s) already checked or in flight today on {engine}")
+    outcomes = {keyword_id: "skipped" for keyword_id in keyword_ids if keyword_id not in claimed}
+    jobs = []
+    for group in groups:
+        group = [target for target in group if target.keyword_id in claimed]
+        if group:
+            jobs.append(SerpJob(group, engine, region, device, language, day))
+    return outcomes, jobs
+
+
+async def fetch_serps(jobs: list[SerpJob], concurrency: int) -> list:
+    """Run the jobs' fetches on the scraper loop, at most `concurrency` at a time.
+
+    Returns each job's results or the exception it raised, in job order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(job: SerpJob):
+        async with semaphore:
+            return await job.fetch()
+
+    return await asyncio.gather(*(fetch(job) for job in jobs), return_exceptions=True)
+
+
+def scrape_batch(targets: list[Target], engine: str, region: str, device: str,
+                 language: str) -> tuple[dict[int, str], list[int], float]:
+    """Scrape each target's SERP, at most BATCH_CONCURRENCY at a time on the scraper loop.
+
+    Returns the final outcome per keyword id, the keyword ids to retry and,
+    if the circuit is open, when to retry them.
+    """
+    engine = engine.lower()
+    if engine not in SCRAPERS:
+        print(f"[!] Unsupported search engine: {engine}")
+        return dict.fromkeys((target.keyword_id for target in targets), "failed"), [], 0.0
+
+    if not circuit_breaker.allow(engine):
+        retry_in = circuit_breaker.retry_in(engine) or circuit_breaker.probe_timeout
+        return {}, [target.keyword_id for target in targets], retry_in
+
+    outcomes, jobs = claim_jobs([[target] for target in targets], engine, region, device, language)
+    failed = []
+    for job, result in zip(jobs, run_sync(fetch_serps(jobs, BATCH_CONCURRENCY))):
+        if isinstance(result, ScrapeError):
+            job.failed(result)
+            if result.retryable:
+                failed.extend(job.keyword_ids)
+            else:
+                outcomes.update(dict.fromkeys(job.keyword_ids, "failed"))
+        elif isinstance(result, BaseException):
+            job.crashed(result)
+            outcomes.update(dict.fromkeys(job.keyword_ids, "failed"))
         else:
-            print(f"[x] Project URL not found in top 100 for '{keyword.name}' on {engine}")
+            try:
+                outcomes.update(record_serp(job, result))
+            except Exception as e:
+                job.crashed(e)
+                outcomes.update(dict.fromkeys(job.keyword_ids, "failed"))
+    return outcomes, failed, 0.0
+
+
+def scrape_and_record(targets: list[Target], engine: str, region: str, device: str, language: str) -> dict[int, str]:
+    """Fetch one SERP for keywords sharing a query and queue a ranking per matching project.
+
+    Returns an outcome per keyword id: found, missing, skipped or failed
+    (see app.tasks.progress).
+
+    Scrape failures feed the engine's circuit breaker. Retryable ones
+    (transient errors, open circuit) are re-raised for the task to retry;
+    hard 4xx and parse failures are logged and dropped.
+    """
+    engine = engine.lower()
+    if engine not in SCRAPERS:
+        print(f"[!] Unsupported search engine: {engine}")
+        return dict.fromkeys((target.keyword_id for target in targets), "failed")
+
+    if not circuit_breaker.allow(engine):
+        raise CircuitOpenError(engine, circuit_breaker.retry_in(engine) or circuit_breaker.probe_timeout)
+
+    outcomes, jobs = claim_jobs([targets], engine, region, device, language)
+    for job, result in zip(jobs, run_sync(fetch_serps(jobs, 1))):
+        if isinstance(result, ScrapeError):
+            job.failed(result)
+            if result.retryable:
+                raise result
+            outcomes.update(dict.fromkeys(job.keyword_ids, "failed"))
+        elif isinstance(result, BaseException):
+            job.crashed(result)
+            raise result
+        else:
+            try:
+                outcomes.update(record_serp(job, result))
+            except Exception as e:
+                job.crashed(e)
+                raise
+    return outcomes
+
+
+def record_serp(job: SerpJob, results: list[dict]) -> dict[int, str]:
+    """Match a fetched SERP against the job's projects and queue their rankings, snapshot and pages."""
+    engine, scraper, outcomes = job.engine, job.scraper, {}
+    matches = job.matcher.first_matches(results)
+
+    if scraper.fetched_pages:
+        circuit_breaker.record_success(engine)
+        fetched_at = datetime.utcnow()
+        snapshot_writer.add(fetched_at=fetched_at, **build_snapshot(engine, scraper.keyword, job.region, job.device,
+                                                                    scraper.language, results))
+        archive_pages(scraper, engine, fetched_at)
+
+    for target in job.targets:
+        result = matches.get(target.keyword_id)
+        # The day's lock is kept once the result is written (ScrapeLocks.confirm).
+        check = (target.keyword_id, engine, job.region, job.device, job.day)
+        if not result:
+            print(f"[x] Project URL not found in top 100 for '{target.keyword}' on {engine}")
+            missing_writer.add(
+                meta=check,
+                keyword_id=target.keyword_id,
+                project_id=target.project_id,
+                search_engine=SearchEngine[engine.upper()],
+                region=job.region,
+                device=DeviceType[job.device.upper()],
+                position=None,
+            )
+            outcomes[target.keyword_id] = "missing"
+            continue
+
+        ranking_writer.add(
+            meta=check,
+            keyword_id=target.keyword_id,
+            project_id=target.project_id,
+            search_engine=SearchEngine[engine.upper()],
+            region=job.region,
+            device=DeviceType[job.device.upper()],
+            position=result["position"],
+            url=result["url"],
+            title=result["title"],
+            snippet=result["snippet"]
+        )
+        print(f"[✓] Recorded position {result['position']} for '{target.keyword}' on {engine}")
+        outcomes[target.keyword_id] = "found"
+
+    return outcomes
+
+
+def archive_pages(scraper, engine: str, fetched_at: datetime):
+    """Keep the raw HTML of freshly fetched pages so they can be re-parsed later."""
+    for page, position_base, html in scraper.raw_pages:
+        page_writer.add(
+            search_engine=SearchEngine[engine.upper()],
+            query=normalize_keyword(scraper.keyword),
+            region=scraper.region,
+            device=DeviceType[scraper.device.upper()],
+            language=scraper.language,
+            page=page,
+            position_base=position_base,
+            content_hash=archive.store(html),
+            fetched_at=fetched_at,
+        )
+
+
+# Close the pooled proxy connections when the worker (or prefork child) exits.
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_scraper_client(**kwargs):
+    shutdown_client()
 
-    except Exception as e:
-        print(f"[!] Error scraping {engine} for keyword '{keyword.name}': {str(e)}")
-     
 
     # for keyword in project.keywords:
     #     for engine in search_engines:
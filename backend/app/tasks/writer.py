@@ -0,0 +1,177 @@
+# tasks/writer.py
+import os
+import threading
+import time
+from datetime import datetime
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+
+from app.database import session_scope
+from app.models import KeywordLatestRank, KeywordRanking, SerpPage, SerpSnapshot
+from app.tasks.adaptive import record_checks
+from app.tasks.dashboard import dashboard_stats
+from app.tasks.latest_rank import rebuild_latest_ranks, upsert_latest_ranks
+from app.tasks.rollups import rebuild_rollup_periods, upsert_rank_rollups
+from app.tasks.runs import scrape_locks
+
+FLUSH_SIZE = int(os.getenv("RANKING_FLUSH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("RANKING_FLUSH_INTERVAL", "5"))
+# Rows kept per writer while the database is unreachable; the oldest go first.
+MAX_BUFFERED = int(os.getenv("RANKING_MAX_BUFFERED", "50000"))
+
+
+class BulkWriter:
+    """Buffers rows of `model` from many scrapes and writes them in bulk.
+
+    Rows are flushed as one multi-row INSERT and a single commit when the
+    buffer reaches `flush_size`, when `flush_interval` seconds have passed
+    (checked by a background thread), and when the worker process exits.
+    `timestamp` is stamped when a row is queued so buffering does not shift it.
+    `write(db, rows)` replaces the INSERT when given, e.g. for rows that only update other tables.
+    Each of the `on_flush(db, rows)` hooks runs in the same transaction as the insert;
+    `on_written(metas)` gets the `meta` passed to `add()` for rows once they are committed.
+
+    Only a lost connection (OperationalError) puts rows back for the next
+    flush, at most `max_buffered` of them. A batch the database rejects is
+    split until the offending rows are found, and those are dropped.
+    """
+
+    def __init__(self, model, timestamp: str, flush_size: int = FLUSH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 on_flush=(), on_written=None, max_buffered: int = MAX_BUFFERED, write=None):
+        self.model = model
+        self.timestamp = timestamp
+        self.write = write
+        self.on_flush = on_flush
+        self.on_written = on_written
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._entries: list[tuple[dict, object]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._retry_at = 0.0
+        self._pid = None
+
+    def add(self, meta=None, **row):
+        """Queue a row. Never raises: scrapes must not fail because the database does."""
+        row.setdefault(self.timestamp, datetime.utcnow())
+        self._ensure_timer()
+        with self._lock:
+            self._entries.append((row, meta))
+            self._trim()
+            # After a lost connection leave retries to the timer instead of every caller.
+            full = len(self._entries) >= self.flush_size and time.monotonic() >= self._retry_at
+        if full:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[!] Flush into {self.model.__tablename__} failed: {str(e)}")
+
+    def flush(self) -> int:
+        with self._lock:
+            entries, self._entries = self._entries, []
+            self._last_flush = time.monotonic()
+        if not entries:
+            return 0
+        try:
+            written = self._write(entries)
+        except OperationalError:
+            # The database is unreachable: keep the rows for the next attempt.
+            with self._lock:
+                self._entries[:0] = entries
+                self._trim()
+                self._retry_at = time.monotonic() + self.flush_interval
+            raise
+        except Exception as e:
+            print(f"[x] Dropped {len(entries)} rows for {self.model.__tablename__}: {str(e)}")
+            return 0
+        print(f"[✓] Flushed {written} rows into {self.model.__tablename__}")
+        return written
+
+    def _write(self, entries: list[tuple[dict, object]]) -> int:
+        rows = [row for row, _ in entries]
+        try:
+            with session_scope() as db:
+                if self.write:
+                    self.write(db, rows)
+                else:
+                    db.execute(insert(self.model), rows)
+                for hook in self.on_flush:
+                    hook(db, rows)
+        except (IntegrityError, DataError) as e:
+            # One bad row (e.g. its keyword was deleted meanwhile) must not sink the batch.
+            if len(entries) == 1:
+                print(f"[!] Dropped a row rejected by {self.model.__tablename__}: {str(e.orig).strip()}")
+                return 0
+            middle = len(entries) // 2
+            return self._write(entries[:middle]) + self._write(entries[middle:])
+        metas = [meta for _, meta in entries if meta is not None]
+        if self.on_written and metas:
+            try:
+                self.on_written(metas)
+            except Exception as e:
+                print(f"[!] After-write hook for {self.model.__tablename__} failed: {str(e)}")
+        return len(rows)
+
+    def _trim(self):
+        # Caller holds the lock.
+        overflow = len(self._entries) - self.max_buffered
+        if overflow > 0:
+            del self._entries[:overflow]
+            print(f"[x] Dropped {overflow} buffered rows for {self.model.__tablename__}: buffer full")
+
+    def _ensure_timer(self):
+        # The timer thread does not survive Celery's fork, so start one per process.
+        # Locked because thread-pool workers call add() from many threads.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run_timer, name="ranking-writer", daemon=True).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval / 2)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"[!] Flush into {self.model.__tablename__} failed: {str(e)}")
+
+
+def rebuild_ranking_aggregates(db, keyword_ids: list[int], start: datetime, end: datetime):
+    """Bring what the ranking_writer hooks maintain (rollups, latest ranks, dashboard) back in
+    line after keyword_rankings rows of `keyword_ids` between `start` and `end` were deleted or replaced."""
+    rebuild_rollup_periods(db, keyword_ids, start, end)
+    before = dashboard_stats.latest_series(db, keyword_ids, lock=True)
+    rebuild_latest_ranks(db, keyword_ids)
+    dashboard_stats.record_rebuilt(db, before, dashboard_stats.latest_series(db, keyword_ids))
+
+
+def record_missing(db, rows: list[dict]):
+    """Checks that did not find the project leave no keyword_rankings row: they
+    only blank the current position in keyword_latest_rank and the dashboard
+    (and reschedule the keyword like any other check)."""
+    dashboard_stats.record_rankings(db, rows)
+    upsert_latest_ranks(db, rows)
+    record_checks(db, rows)
+
+
+ranking_writer = BulkWriter(KeywordRanking, "checked_at",
+                            on_flush=(dashboard_stats.record_rankings, upsert_latest_ranks, upsert_rank_rollups, record_checks),
+                            on_written=scrape_locks.confirm)
+snapshot_writer = BulkWriter(SerpSnapshot, "fetched_at")
+missing_writer = BulkWriter(KeywordLatestRank, "checked_at", write=record_missing, on_written=scrape_locks.confirm)
+page_writer = BulkWriter(SerpPage, "fetched_at")
+
+
+# Prefork children send worker_process_shutdown; thread-pool workers only worker_shutdown.
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_on_shutdown(**kwargs):
+    ranking_writer.flush()
+    missing_writer.flush()
+    snapshot_writer.flush()
+    page_writer.flush()
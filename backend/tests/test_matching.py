@@ -0,0 +1,45 @@
+import base64
+
+from app.scrapers.matching import DomainMatcher, split_url, unwrap_redirect
+
+YAHOO_HREF = (
+    "https://r.search.yahoo.com/_ylt=AwrFGHDy3Ipl0W0BtwJXNyoA;_ylu=Y29sbwNiZjEEcG9zAzEEdnRpZAMEc2VjA3Ny"
+    "/RV=2/RE=1703628147/RO=10/RU=https%3a%2f%2fwww.example.com%2fpage/RK=2/RS=m0ZtNvGJq3aX0r_1ylnXXyqbAqM-"
+)
+
+
+def bing_href(target: str) -> str:
+    encoded = base64.urlsafe_b64encode(target.encode()).decode().rstrip("=")
+    return f"https://www.bing.com/ck/a?!&&p=5a1c8f0e7b3a&ptn=3&ver=2&u=a1{encoded}&ntb=1"
+
+
+def test_split_url_ignores_www_scheme_and_trailing_slash():
+    assert split_url("https://www.Example.com/blog/") == (["com", "example"], "/blog")
+    assert split_url("example.com") == (["com", "example"], "")
+
+
+def test_unwrap_yahoo_redirect():
+    assert unwrap_redirect(YAHOO_HREF) == "https://www.example.com/page"
+
+
+def test_unwrap_bing_redirect():
+    assert unwrap_redirect(bing_href("https://www.example.com/a?b=1")) == "https://www.example.com/a?b=1"
+    assert unwrap_redirect("https://www.bing.com/ck/a?u=a1!!!") == "https://www.bing.com/ck/a?u=a1!!!"
+
+
+def test_unwrap_leaves_plain_links():
+    assert unwrap_redirect("https://search.yahoo.com/RU=x") == "https://search.yahoo.com/RU=x"
+
+
+def test_owners_follow_engine_redirects():
+    matcher = DomainMatcher([("example.com", 1), ("example.com/blog", 2), ("other.com", 3)])
+    assert matcher.owners(YAHOO_HREF) == [1]
+    assert matcher.owners(bing_href("https://blog.example.com/")) == [1]
+    assert matcher.owners(bing_href("https://example.com/blog/post")) == [1, 2]
+    assert matcher.owners("https://r.search.yahoo.com/_ylt=x/RU=https%3a%2f%2fnotexample.com%2f/RK=2") == []
+
+
+def test_first_matches_keeps_best_position():
+    matcher = DomainMatcher([("example.com", 1)])
+    results = [{"url": "https://other.com"}, {"url": YAHOO_HREF}, {"url": "https://example.com/second"}]
+    assert matcher.first_matches(results) == {1: results[1]}
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.dependencies import get_current_user
+from app.routers import rankings
+
+
+def client_for(db) -> TestClient:
+    app = FastAPI()
+    app.include_router(rankings.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: object()
+    return TestClient(app)
+
+
+def test_as_naive_utc():
+    aware = datetime(2025, 8, 1, 3, 0, tzinfo=timezone(timedelta(hours=3)))
+    assert rankings.as_naive_utc(aware) == datetime(2025, 8, 1, 0, 0)
+    assert rankings.as_naive_utc(datetime(2025, 8, 1)) == datetime(2025, 8, 1)
+    assert rankings.as_naive_utc(None) is None
+
+
+def test_chart_data_accepts_aware_from_for_dashboard_trend(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rankings, "user_project_ids", lambda db, user: [1])
+    monkeypatch.setattr(rankings.dashboard_stats, "trend", lambda project_ids, days: calls.append(days) or [])
+    since = (datetime.now(timezone.utc) - timedelta(days=10, hours=1)).isoformat()
+
+    response = client_for(MagicMock()).get("/rankings/chart-data", params={"from": since})
+
+    assert response.status_code == 200
+    assert calls == [11]
+
+
+def test_chart_data_accepts_aware_range_for_rollups():
+    db = MagicMock()
+    db.query.return_value.filter.return_value.filter.return_value.group_by.return_value.order_by.return_value.all.return_value = []
+
+    response = client_for(db).get("/rankings/chart-data", params={
+        "project_id": 1, "from": "2025-08-01T00:00:00+03:00", "to": "2025-08-15T12:00:00Z",
+    })
+
+    assert response.status_code == 200
+    assert response.json() == []
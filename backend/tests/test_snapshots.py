@@ -0,0 +1,22 @@
+import json
+import zlib
+
+from app import snapshots
+from tests.test_matching import YAHOO_HREF, bing_href
+
+
+def test_domain_of_follows_engine_redirects():
+    assert snapshots.domain_of(YAHOO_HREF) == "example.com"
+    assert snapshots.domain_of(bing_href("https://blog.example.com/post")) == "blog.example.com"
+    assert snapshots.domain_of("https://www.example.com/") == "example.com"
+
+
+def test_build_snapshot_stores_redirect_targets(monkeypatch):
+    monkeypatch.setattr(snapshots, "resolve_domain_ids", lambda domains: {d: i for i, d in enumerate(sorted(domains))})
+    results = [
+        {"position": 1, "url": YAHOO_HREF, "title": "Example"},
+        {"position": 2, "url": "https://other.com/", "title": "Other"},
+    ]
+    row = snapshots.build_snapshot("yahoo", "Some Query", "US", "desktop", "en", results)
+    assert row["domain_ids"] == [0, 1]
+    assert json.loads(zlib.decompress(row["payload"])) == [["https://www.example.com/page", "Example"], ["https://other.com/", "Other"]]